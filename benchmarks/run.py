@@ -0,0 +1,303 @@
+"""
+Offline benchmark suite for the document pipeline.
+
+Runs without Ollama: the LLM stage uses FakeChatModel with a fixed
+artificial latency, so numbers reflect our own code (loaders, OCR,
+chunking, concurrency) plus a constant, known LLM cost.
+
+    python -m benchmarks.run                      # run all suites, compare to baseline
+    python -m benchmarks.run --suite loaders      # one suite
+    python -m benchmarks.run --save-baseline      # store current numbers as the baseline
+
+Results are written as JSON (--output). Every metric is a time in seconds
+(lower is better); a metric slower than baseline * (1 + --threshold), and
+by more than --min-delta seconds, is a regression and makes the command
+exit with status 1. A missing baseline is an error (status 2), not a pass:
+baselines are per machine, create one with --save-baseline first.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = os.path.join(ROOT, 'samples')
+DEFAULT_OUTPUT = os.path.join(ROOT, 'benchmarks', 'results', 'latest.json')
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+# Sample folder per loader
+LOADER_SAMPLES = {
+    'text': 'txtfiles',
+    'word': 'docfiles',
+    'image': 'imgfiles',
+    'pdf': 'sample_PFD',
+}
+OCR_LOADERS = {'image'}
+
+
+def sample_files(kind: str) -> List[str]:
+    folder = os.path.join(SAMPLES, LOADER_SAMPLES[kind])
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder))
+
+
+def time_call(func: Callable[[], object], repeat: int) -> float:
+    """ Median wall time of func over repeat runs """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def has_tesseract() -> bool:
+    return shutil.which('tesseract') is not None
+
+
+def bench_loaders(args) -> Dict[str, float]:
+    """ Median extraction time per file, for each loader over samples/ """
+    from documents.loaders import LoaderFactory
+
+    results = {}
+    for kind in LOADER_SAMPLES:
+        if kind in OCR_LOADERS and not has_tesseract():
+            print(f"  loaders.{kind}: skipped (tesseract not installed)")
+            continue
+
+        per_file = []
+        for path in sample_files(kind):
+            loader = LoaderFactory.get_loader(path)
+            per_file.append(time_call(lambda: loader.extract(path), args.repeat))
+
+        results[f'loaders.{kind}.median_file_s'] = statistics.median(per_file)
+        results[f'loaders.{kind}.total_s'] = sum(per_file)
+    return results
+
+
+def bench_pipeline(args) -> Dict[str, float]:
+    """ End-to-end process_batch wall time with the fake LLM (sequential,
+    concurrent, and concurrent with small documents packed per request) """
+    from documents.llm.fake import FakeChatModel
+    from documents.llm.processor import LLMProcessor
+    from documents.pipeline import Pipeline
+
+    kinds = [kind for kind in LOADER_SAMPLES if kind not in OCR_LOADERS or has_tesseract()]
+    files = [path for kind in kinds for path in sample_files(kind)]
+
+    results = {}
+    for name, workers, pack in [('serial', 1, False), ('concurrent', None, False), ('packed', None, True)]:
+        pipeline = Pipeline(
+            extract_workers=workers,
+            llm_workers=workers,
+            use_cache=False,
+            pack_documents=pack,
+            processor=LLMProcessor(llm=FakeChatModel(latency=args.llm_latency)),
+        )
+        try:
+            # First run starts worker pools - keep it out of the numbers
+            pipeline.process_batch(files[:2])
+            seconds = time_call(lambda: pipeline.process_batch(files), args.repeat)
+        finally:
+            pipeline.close()
+
+        results[f'pipeline.batch.{name}.total_s'] = seconds
+        results[f'pipeline.batch.{name}.per_doc_s'] = seconds / len(files)
+        print(f"  pipeline.batch.{name}: {len(files)} docs in {seconds:.2f}s "
+              f"({len(files) / seconds:.1f} docs/s)")
+    return results
+
+
+def _legacy_image_preprocess(image):
+    """ ImageLoader._preprocess_image before documents.extractors.preprocess """
+    from PIL import ImageEnhance, ImageOps
+
+    img = image.convert('L')
+    avg_brightness = sum(img.getdata()) / (img.width * img.height)
+    if avg_brightness < 128:
+        img = ImageOps.invert(img)
+    img = ImageEnhance.Contrast(img).enhance(2.0)
+    return ImageEnhance.Sharpness(img).enhance(1.5)
+
+
+def _legacy_pdf_preprocess(img):
+    """ PDFLoader._preprocess_image before documents.extractors.preprocess """
+    from PIL import ImageEnhance
+
+    mask = img.convert('L').point(lambda x: 255 if x < 250 else 0)
+    bbox = mask.getbbox()
+    if bbox:
+        padding = 20
+        img = img.crop((
+            max(0, bbox[0] - padding), max(0, bbox[1] - padding),
+            min(img.width, bbox[2] + padding), min(img.height, bbox[3] + padding),
+        ))
+    img = img.convert('L')
+    img = ImageEnhance.Contrast(img).enhance(2.0)
+    return ImageEnhance.Sharpness(img).enhance(1.5)
+
+
+def bench_preprocess(args) -> Dict[str, float]:
+    """ OCR preprocessing: legacy PIL code vs the NumPy module, on a
+    12-megapixel phone photo and a 300 DPI A4 page """
+    import numpy as np
+    from PIL import Image
+    from documents.extractors import preprocess
+
+    rng = np.random.default_rng(0)
+    # Photo: noisy RGB with a dark background (exercises the inversion path)
+    photo = Image.fromarray((rng.random((3000, 4000, 3)) * 140).astype(np.uint8), 'RGB')
+    # Page: white A4 with a dark text block and margins (exercises the crop)
+    page_pixels = np.full((3508, 2480), 255, dtype=np.uint8)
+    page_pixels[300:3200, 200:2280] = (rng.random((2900, 2080)) * 255).astype(np.uint8)
+    page = Image.fromarray(page_pixels, 'L')
+
+    cases = {
+        'photo_12mp': (
+            lambda: _legacy_image_preprocess(photo),
+            lambda: preprocess.preprocess_for_ocr(photo, invert_dark=True),
+        ),
+        'pdf_page_a4': (
+            lambda: _legacy_pdf_preprocess(page),
+            lambda: preprocess.preprocess_for_ocr(page_pixels, crop=True),
+        ),
+    }
+
+    results = {}
+    for name, (legacy, vectorised) in cases.items():
+        legacy_s = time_call(legacy, args.repeat)
+        numpy_s = time_call(vectorised, args.repeat)
+        results[f'preprocess.{name}.legacy_s'] = legacy_s
+        results[f'preprocess.{name}.numpy_s'] = numpy_s
+        print(f"  preprocess.{name}: legacy {legacy_s:.3f}s, numpy {numpy_s:.3f}s "
+              f"({legacy_s / numpy_s:.1f}x)")
+    return results
+
+
+def bench_rules(args) -> Dict[str, float]:
+    """ LLM stage per document: LLM only vs rule-based fast path first,
+    over the text and Word samples """
+    from documents import metrics
+    from documents.llm.fake import FakeChatModel
+    from documents.llm.processor import LLMProcessor
+    from documents.loaders import LoaderFactory
+
+    texts = []
+    for kind in ('text', 'word'):
+        for path in sample_files(kind):
+            texts.append(LoaderFactory.get_loader(path).extract(path).text)
+
+    results = {}
+    for name, use_rules in [('llm_only', False), ('rules_first', True)]:
+        processor = LLMProcessor(llm=FakeChatModel(latency=args.llm_latency), use_rules=use_rules)
+        with metrics.collect() as timings:
+            seconds = time_call(lambda: [processor.process_chunked(text) for text in texts], args.repeat)
+        results[f'rules.{name}.per_doc_s'] = seconds / len(texts)
+        if use_rules:
+            hits = timings.counts.get('rules_hit', 0) / args.repeat
+            print(f"  rules: {hits:.0f}/{len(texts)} documents without an LLM call ({hits / len(texts):.0%})")
+    print(f"  rules: {results['rules.llm_only.per_doc_s']:.3f}s -> "
+          f"{results['rules.rules_first.per_doc_s']:.3f}s per document")
+    return results
+
+
+SUITES: Dict[str, Callable] = {
+    'loaders': bench_loaders,
+    'pipeline': bench_pipeline,
+    'preprocess': bench_preprocess,
+    'rules': bench_rules,
+}
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float, min_delta: float) -> List[str]:
+    """ Return a line per metric that got slower than the threshold allows
+
+    min_delta keeps sub-millisecond metrics from flagging on timer noise.
+    """
+    regressions = []
+    for name, value in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            continue
+        change = (value - base) / base
+        marker = ""
+        if change > threshold and value - base > min_delta:
+            marker = "  <-- REGRESSION"
+            regressions.append(f"{name}: {base:.4f}s -> {value:.4f}s (+{change:.0%})")
+        print(f"  {name}: {base:.4f}s -> {value:.4f}s ({change:+.0%}){marker}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suite', action='append', choices=sorted(SUITES), help="Suite(s) to run (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (median is kept)")
+    parser.add_argument('--llm-latency', type=float, default=0.05, help="Fake LLM latency per call, seconds")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Where to write results JSON")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument('--min-delta', type=float, default=0.001, help="Ignore slowdowns smaller than this, seconds")
+    parser.add_argument('--save-baseline', action='store_true', help="Write results to the baseline file")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('PIPELINE_WARMUP', 'false')
+
+    results: Dict[str, float] = {}
+    for name in args.suite or sorted(SUITES):
+        print(f"[{name}]")
+        results.update(SUITES[name](args))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "llm_latency": args.llm_latency,
+        },
+        "results": results,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(
+            f"\nNo baseline at {args.baseline} - nothing was compared. "
+            "Run with --save-baseline on this machine first.",
+            file=sys.stderr,
+        )
+        return 2
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+
+    print(f"\nCompared to {args.baseline} (threshold {args.threshold:.0%}):")
+    regressions = compare(results, baseline, args.threshold, args.min_delta)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+
+    print("No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,16 @@
+"""
+ASGI entry point (uvicorn config.asgi:application, daphne).
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+application = get_asgi_application()
+
+# Each server worker process loads this module - warm up its shared pipeline
+# before the first request (runserver does this in DocumentsConfig.ready())
+from documents.apps import start_warm_up  # noqa: E402
+
+start_warm_up()
@@ -44,3 +44,18 @@ REST_FRAMEWORK = {
 LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'ollama')
 OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
 OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.2')
+
+# Structured pipeline events (chunking, merge, warm-up) - see documents/metrics.py
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'documents.events': {
+            'handlers': ['console'],
+            'level': os.getenv('PIPELINE_EVENT_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
@@ -0,0 +1,16 @@
+"""
+WSGI entry point (gunicorn config.wsgi, uWSGI, mod_wsgi).
+"""
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+application = get_wsgi_application()
+
+# Each server worker process loads this module - warm up its shared pipeline
+# before the first request (runserver does this in DocumentsConfig.ready())
+from documents.apps import start_warm_up  # noqa: E402
+
+start_warm_up()
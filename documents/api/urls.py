@@ -1,8 +1,10 @@
 """API URL configuration."""
 from django.urls import path
-from .views import process_documents
+from .views import process_documents, create_job, job_status, metrics
 
 urlpatterns = [
-    path('process/', process_documents, name='process-documents')
-   
+    path('process/', process_documents, name='process-documents'),
+    path('jobs/', create_job, name='create-job'),
+    path('jobs/<str:job_id>/', job_status, name='job-status'),
+    path('metrics/', metrics, name='metrics'),
 ]
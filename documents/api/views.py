@@ -1,24 +1,69 @@
-import os
-import tempfile
-import shutil
-from rest_framework.decorators import api_view
+import json
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view, renderer_classes
+from rest_framework.renderers import BaseRenderer
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.settings import api_settings
 
-from ..pipeline import Pipeline
+from ..jobs import get_job_store
+from ..metrics import REGISTRY
+from ..pipeline import get_pipeline
 from dataclasses import asdict
 
 
+class NDJSONRenderer(BaseRenderer):
+    """ Lets clients ask for Accept: application/x-ndjson (otherwise DRF
+    answers 406) - non-streamed responses become a single JSON line """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return (json.dumps(data) + "\n").encode(self.charset)
+
+
+def _wants_stream(request) -> bool:
+    """ Streaming is opt-in: ?stream=ndjson or Accept: application/x-ndjson """
+    stream = request.query_params.get('stream', '').lower()
+    return stream in ('1', 'true', 'ndjson') or 'application/x-ndjson' in request.headers.get('Accept', '')
+
+
+def _stream_ndjson(sources):
+    """ Yield one JSON line per finished document, then a metadata line """
+    total = successful = 0
+    try:
+        for index, doc in get_pipeline().iter_batch_indexed(sources):
+            total += 1
+            successful += doc.error is None
+            # index = position of the upload, lines arrive in completion order
+            yield json.dumps({"index": index, "document": asdict(doc)}) + "\n"
+
+        yield json.dumps({
+            "metadata": {
+                "total": total,
+                "successful": successful,
+                "failed": total - successful,
+            }
+        }) + "\n"
+
+    except Exception as e:
+        yield json.dumps({"error": f"Processing failed: {str(e)}"}) + "\n"
+
+
 @api_view(['POST'])
+@renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer])
 def process_documents(request):
     """
     Process uploaded documents and return structured data.
-    
+
     POST /api/process/
     Content-Type: multipart/form-data
     Body: documents[] - one or more files
-    
-    
+
+    Add ?stream=ndjson to get one JSON line per document as soon as it is
+    done ({"index": upload position, "document": ...}), followed by a
+    {"metadata": ...} line.
 
     """
     files = request.FILES.getlist('documents')
@@ -29,21 +74,18 @@ def process_documents(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # Create temp directory properly 
-    temp_dir = tempfile.mkdtemp(prefix='doc_pipeline_')
-    temp_paths = []
-
     try:
-        for file in files:
-            temp_path = os.path.join(temp_dir, file.name)
-            with open(temp_path, 'wb') as f:
-                for chunk in file.chunks():
-                    f.write(chunk)
-            temp_paths.append(temp_path)
+        # Uploads go to the loaders straight from memory - no temp files
+        sources = [(file.name, file.read()) for file in files]
+
+        if _wants_stream(request):
+            return StreamingHttpResponse(
+                _stream_ndjson(sources),
+                content_type='application/x-ndjson',
+            )
 
-        # Process through pipeline
-        pipeline = Pipeline()
-        result = pipeline.process_batch(temp_paths)
+        # Process through the shared pipeline (built once per worker process)
+        result = get_pipeline().process_batch(sources)
 
         response_data = {
             "documents": [asdict(doc) for doc in result.documents],
@@ -62,7 +104,72 @@ def process_documents(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-    finally:
-        # Clean up entire temp directory
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+
+@api_view(['POST'])
+def create_job(request):
+    """
+    Queue uploaded documents for background processing.
+
+    POST /api/jobs/
+    Content-Type: multipart/form-data
+    Body: documents[] - one or more files
+
+    Returns 202 with a job id. Run `python manage.py process_jobs` to
+    process the queue, and poll GET /api/jobs/<job_id>/ for results.
+    """
+    files = request.FILES.getlist('documents')
+
+    if not files:
+        return Response(
+            {"error": "No files provided. Use 'documents' field to upload files."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    job_id = get_job_store().enqueue([(file.name, file.read()) for file in files])
+
+    return Response(
+        {
+            "job_id": job_id,
+            "status": "queued",
+            "total": len(files),
+            "status_url": f"/api/jobs/{job_id}/",
+        },
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
+@api_view(['GET'])
+def job_status(request, job_id):
+    """
+    Progress and per-document results of a queued job.
+
+    GET /api/jobs/<job_id>/
+    """
+    job = get_job_store().get_job(job_id)
+
+    if job is None:
+        return Response({"error": f"Unknown job: {job_id}"}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response(job)
+
+
+@api_view(['GET'])
+def metrics(request):
+    """
+    Pipeline metrics in Prometheus text format.
+
+    GET /api/metrics/
+
+    Stage timings (p50/p95/p99), pages OCR'd and chunks per document,
+    document counts and result cache counters for this worker process.
+    """
+    gauges = {}
+    cache_stats = get_pipeline().cache_stats()
+    if cache_stats:
+        for name in ('hits', 'misses', 'memory_hits', 'disk_hits', 'hit_rate', 'memory_entries', 'disk_entries'):
+            gauges[f'cache_{name}'] = cache_stats[name]
+
+    return HttpResponse(
+        REGISTRY.render(extra_gauges=gauges),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
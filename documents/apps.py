@@ -1,6 +1,58 @@
+import os
+import sys
+import threading
+from typing import List, Optional
+
 from django.apps import AppConfig
 
 
+def serves_requests(argv: Optional[List[str]] = None) -> bool:
+    """ True in the process that will answer HTTP requests under runserver
+
+    Not for other commands (check, migrate, shell, process_jobs, tests) and
+    not for the autoreloader parent, which only watches files - its child
+    gets RUN_MAIN=true. Other servers (gunicorn, uvicorn) call
+    start_warm_up() from config/wsgi.py / config/asgi.py instead, and the
+    process_jobs worker from its handle().
+    """
+    argv = sys.argv if argv is None else argv
+    if len(argv) < 2 or argv[1] != 'runserver':
+        return False
+    return '--noreload' in argv or os.environ.get('RUN_MAIN') == 'true'
+
+
+_warm_up_started = False
+_warm_up_lock = threading.Lock()
+
+
+def start_warm_up() -> bool:
+    """ Build the shared pipeline and load the model in the background
+    (PIPELINE_WARMUP, default true) - once per process
+
+    Returns : True if this call started the warm-up
+    """
+    global _warm_up_started
+    if os.getenv('PIPELINE_WARMUP', 'true').lower() != 'true':
+        return False
+    with _warm_up_lock:
+        if _warm_up_started:
+            return False
+        _warm_up_started = True
+    threading.Thread(target=_warm_up, name='pipeline-warmup', daemon=True).start()
+    return True
+
+
+def _warm_up():
+    from .pipeline import get_pipeline
+    get_pipeline().warm_up()
+
+
 class DocumentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'documents'
+
+    def ready(self):
+        # Warm up the serving process so the first request does not pay for
+        # client setup or a model cold start
+        if serves_requests():
+            start_warm_up()
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class ResultCache:
+    """ Two tier cache for processed document results.
+
+    Memory tier : LRU of recent results (per process)
+    Disk tier   : SQLite file shared by all worker processes
+
+    Values are plain dicts (JSON serialisable), stored serialised so every
+    get() returns a fresh copy. Entries older than the TTL are treated as
+    misses, and each tier is trimmed to its max size.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_entries: int = 256,
+        max_disk_entries: int = 10000,
+        ttl_seconds: float = 7 * 24 * 3600,
+    ):
+        """
+        Args:
+            path               : SQLite file for the disk tier (None = memory only)
+            max_memory_entries : LRU size of the memory tier
+            max_disk_entries   : Max rows kept in the disk tier
+            ttl_seconds        : Entry lifetime in both tiers
+        """
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(content_hash: str, provider: str, model: str, prompt_version: str, settings: str = "") -> str:
+        """ Build a cache key from file content hash, LLM settings and the
+        fingerprint of other result-changing settings """
+        return f"{content_hash}:{provider}:{model}:{prompt_version}:{settings}"
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """ SHA-256 of in-memory content """
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """ SHA-256 of a file's content """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, payload: str, created_at: float):
+        """ Put serialised entry in the memory tier (lock must be held) """
+        self._memory[key] = (payload, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """ Look up a key in memory, then on disk. Returns None on miss. """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                payload, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return json.loads(payload)
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._conn.commit()
+                        self._remember(key, row[0], row[1])
+                        self.disk_hits += 1
+                        return json.loads(row[0])
+                    self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                    self._conn.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """ Store a value in both tiers and evict expired/oldest entries """
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            self._remember(key, payload, now)
+
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, payload, now, now),
+                )
+                if self.ttl_seconds is not None:
+                    self._conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._conn.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    " SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+                self._conn.commit()
+
+    def clear(self):
+        """ Drop all entries from both tiers """
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM results")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """ Hit/miss counters and tier sizes """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            disk_entries = 0
+            if self._conn is not None:
+                disk_entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            return {
+                "hits": hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def get_default_cache() -> Optional[ResultCache]:
+    """ Build the result cache from env config
+
+    PIPELINE_CACHE             : 'true' / 'false' (default true)
+    PIPELINE_CACHE_PATH        : SQLite file (default .cache/results.sqlite3 in project root,
+                                 empty for memory only)
+    PIPELINE_CACHE_TTL         : Entry lifetime in seconds (default 7 days)
+    PIPELINE_CACHE_MAX_ENTRIES : Max rows on disk (default 10000)
+    PIPELINE_CACHE_MEMORY_ENTRIES : LRU size in memory (default 256)
+    """
+    if os.getenv('PIPELINE_CACHE', 'true').lower() != 'true':
+        return None
+
+    default_path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'results.sqlite3'
+    )
+    return ResultCache(
+        path=os.getenv('PIPELINE_CACHE_PATH', default_path) or None,
+        max_memory_entries=int(os.getenv('PIPELINE_CACHE_MEMORY_ENTRIES', 256)),
+        max_disk_entries=int(os.getenv('PIPELINE_CACHE_MAX_ENTRIES', 10000)),
+        ttl_seconds=float(os.getenv('PIPELINE_CACHE_TTL', 7 * 24 * 3600)),
+    )
@@ -0,0 +1,498 @@
+"""
+OCR backends used by the image and PDF loaders.
+
+pytesseract starts a new `tesseract` process (and reloads the language
+models) for every call. The tesserocr backend instead keeps Tesseract
+engines loaded in the current process and reuses them, so the OCR pool
+workers and the extraction processes pay the model load once.
+
+Select with OCR_BACKEND = auto (tesserocr if installed) | tesserocr | pytesseract
+
+recognise() is the loaders' entry point. It first runs Tesseract's
+orientation and script detection (OSD, see detect_layout()) on a thumbnail
+to rotate the page upright and pick the smallest language set
+(OCR_DETECT_SCRIPT, by default per page only with tesserocr; with pytesseract
+the loaders detect the script once per document, see document_lang()). Then one word-level
+OCR pass (image_to_data) gives a real confidence, and only the lines (or,
+if nothing was read, the page) that scored low are re-OCR'd.
+"""
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from documents import metrics
+
+
+DEFAULT_LANG = 'eng'
+DEFAULT_PSM = 6  # single uniform block of text
+
+# English + Hindi, for documents that may be in either
+MULTI_LANG = 'eng+hin'
+
+# Tesseract script name -> language packs
+SCRIPT_LANGS = {
+    'Latin': 'eng',
+    'Devanagari': 'eng+hin',  # Hindi documents routinely mix in English
+}
+
+# OSD runs on a thumbnail no larger than this (longest side, pixels)
+OSD_MAX_SIDE = 1200
+MIN_SCRIPT_CONF = 1.0
+MIN_ORIENTATION_CONF = 2.0
+
+# Lines (and pages) below this confidence (0-1) are re-OCR'd
+MIN_CONFIDENCE = float(os.getenv('OCR_MIN_CONFIDENCE', 0.6))
+LINE_PSM = 7  # single text line
+AUTO_PSM = 3  # automatic page segmentation
+LINE_PADDING = 4
+# More low-confidence lines than this: re-OCR the whole page instead
+MAX_RETRY_LINES = 10
+
+
+@dataclass
+class OSDResult:
+    """ Orientation and script detection result """
+    rotate: int  # degrees to rotate clockwise to make the page upright
+    orientation_conf: float
+    script: str
+    script_conf: float
+
+
+@dataclass
+class OCRWord:
+    """ One recognised word """
+    text: str
+    confidence: float  # 0-100, as reported by Tesseract
+    box: Tuple[int, int, int, int]  # left, top, right, bottom
+    block: int  # paragraph number
+    line: int  # line number (unique within the page)
+
+
+@dataclass
+class OCRLine:
+    """ Words of one text line """
+    words: List[OCRWord]
+    block: int
+
+    @property
+    def text(self) -> str:
+        return " ".join(word.text for word in self.words)
+
+    @property
+    def confidence(self) -> float:
+        """ Character-weighted mean word confidence, 0-1 """
+        chars = sum(len(word.text) for word in self.words)
+        if not chars:
+            return 0.0
+        return sum(word.confidence * len(word.text) for word in self.words) / chars / 100
+
+    @property
+    def box(self) -> Tuple[int, int, int, int]:
+        return (
+            min(word.box[0] for word in self.words),
+            min(word.box[1] for word in self.words),
+            max(word.box[2] for word in self.words),
+            max(word.box[3] for word in self.words),
+        )
+
+
+@dataclass
+class OCRResult:
+    """ Word-level OCR output of a page/image """
+    lines: List[OCRLine]
+
+    @classmethod
+    def from_words(cls, words: List[OCRWord]) -> "OCRResult":
+        """ Group words (in reading order) into lines """
+        lines: List[OCRLine] = []
+        for word in words:
+            if not word.text.strip():
+                continue
+            if lines and lines[-1].words[-1].line == word.line:
+                lines[-1].words.append(word)
+            else:
+                lines.append(OCRLine(words=[word], block=word.block))
+        return cls(lines=lines)
+
+    @property
+    def text(self) -> str:
+        """ Lines joined by newlines, blank line between paragraphs """
+        parts = []
+        for i, line in enumerate(self.lines):
+            if i and line.block != self.lines[i - 1].block:
+                parts.append("")
+            parts.append(line.text)
+        return "\n".join(parts)
+
+    @property
+    def confidence(self) -> float:
+        """ Character-weighted mean word confidence, 0-1 (0 if empty) """
+        words = [word for line in self.lines for word in line.words]
+        chars = sum(len(word.text) for word in words)
+        if not chars:
+            return 0.0
+        return sum(word.confidence * len(word.text) for word in words) / chars / 100
+
+    def low_confidence_lines(self, threshold: float = MIN_CONFIDENCE) -> List[int]:
+        """ Indexes of lines scoring below threshold """
+        return [i for i, line in enumerate(self.lines) if line.confidence < threshold]
+
+
+class OCRBackend(ABC):
+    """ Turns an image into text """
+
+    name: str = ""
+
+    def detect_osd(self, image: Image.Image) -> Optional[OSDResult]:
+        """ Orientation and script of the image (None if undetectable,
+        e.g. too little text) """
+        return None
+
+    @abstractmethod
+    def image_to_data(self, image: Image.Image, lang: str = DEFAULT_LANG, psm: int = DEFAULT_PSM) -> OCRResult:
+        """ OCR the image with word boxes and confidences
+
+        Args : image - PIL image
+               lang - Tesseract language packs, e.g. 'eng' or 'eng+hin'
+               psm - Tesseract page segmentation mode
+        Returns : OCRResult
+        """
+        pass
+
+
+class PytesseractBackend(OCRBackend):
+    """ One tesseract subprocess per call (fallback, no extra dependency) """
+
+    name = 'pytesseract'
+
+    def image_to_data(self, image: Image.Image, lang: str = DEFAULT_LANG, psm: int = DEFAULT_PSM) -> OCRResult:
+        import pytesseract
+
+        data = pytesseract.image_to_data(
+            image, lang=lang, config=f'--oem 3 --psm {psm}', output_type=pytesseract.Output.DICT,
+        )
+        words = []
+        line_ids: Dict[Tuple[int, int, int], int] = {}
+        block_ids: Dict[Tuple[int, int], int] = {}
+        for i, text in enumerate(data['text']):
+            confidence = float(data['conf'][i])
+            if confidence < 0 or not text.strip():
+                continue  # page/block/line rows and empty words
+            block_key = (data['block_num'][i], data['par_num'][i])
+            line_key = block_key + (data['line_num'][i],)
+            left, top = data['left'][i], data['top'][i]
+            words.append(OCRWord(
+                text = text,
+                confidence = confidence,
+                box = (left, top, left + data['width'][i], top + data['height'][i]),
+                block = block_ids.setdefault(block_key, len(block_ids)),
+                line = line_ids.setdefault(line_key, len(line_ids)),
+            ))
+        return OCRResult.from_words(words)
+
+    def detect_osd(self, image: Image.Image) -> Optional[OSDResult]:
+        import pytesseract
+
+        try:
+            osd = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+        except pytesseract.TesseractError:
+            # "Too few characters" and similar - nothing to go on
+            return None
+        return OSDResult(
+            rotate = int(osd['rotate']),
+            orientation_conf = float(osd['orientation_conf']),
+            script = osd['script'],
+            script_conf = float(osd['script_conf']),
+        )
+
+
+class TesserocrBackend(OCRBackend):
+    """ Long-lived in-process Tesseract engines (tesserocr)
+
+    Engines are pooled per (lang, psm): a thread takes an idle engine or
+    creates one, and puts it back afterwards, so concurrent threads never
+    share an engine and models are loaded once per engine.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self):
+        import tesserocr
+
+        self._tesserocr = tesserocr
+        self._pools: Dict[Tuple[str, int], queue.LifoQueue] = {}
+        self._lock = threading.Lock()
+        self._osd_available = True
+
+    def _pool(self, lang: str, psm: int) -> queue.LifoQueue:
+        with self._lock:
+            return self._pools.setdefault((lang, psm), queue.LifoQueue())
+
+    @contextmanager
+    def _engine(self, lang: str, psm: int) -> Iterator:
+        pool = self._pool(lang, psm)
+        try:
+            api = pool.get_nowait()
+        except queue.Empty:
+            api = self._tesserocr.PyTessBaseAPI(
+                lang = lang,
+                psm = self._tesserocr.PSM(psm),
+                oem = self._tesserocr.OEM.DEFAULT,
+            )
+        try:
+            yield api
+        finally:
+            api.Clear()
+            pool.put(api)
+
+    def image_to_data(self, image: Image.Image, lang: str = DEFAULT_LANG, psm: int = DEFAULT_PSM) -> OCRResult:
+        RIL = self._tesserocr.RIL
+        words = []
+        block = line = -1
+        with self._engine(lang, psm) as api:
+            api.SetImage(image)
+            api.Recognize()
+            for word in self._tesserocr.iterate_level(api.GetIterator(), RIL.WORD):
+                if word.IsAtBeginningOf(RIL.PARA):
+                    block += 1
+                if word.IsAtBeginningOf(RIL.TEXTLINE):
+                    line += 1
+                text = word.GetUTF8Text(RIL.WORD)
+                box = word.BoundingBox(RIL.WORD)
+                if not text or box is None:
+                    continue
+                words.append(OCRWord(
+                    text = text,
+                    confidence = float(word.Confidence(RIL.WORD)),
+                    box = tuple(box),
+                    block = max(block, 0),
+                    line = max(line, 0),
+                ))
+        return OCRResult.from_words(words)
+
+    def detect_osd(self, image: Image.Image) -> Optional[OSDResult]:
+        if not self._osd_available:
+            return None
+        try:
+            with self._engine('osd', self._tesserocr.PSM.OSD_ONLY) as api:
+                api.SetImage(image)
+                osd = api.DetectOrientationScript()
+        except RuntimeError:
+            # osd.traineddata is not installed - OCR without detection, as
+            # the pytesseract backend does, and do not try again
+            self._osd_available = False
+            return None
+        if not osd:
+            return None
+        return OSDResult(
+            # orient_deg is the page orientation; the fix is the opposite turn
+            rotate = (360 - int(osd['orient_deg'])) % 360,
+            orientation_conf = float(osd['orient_conf']),
+            script = osd['script_name'],
+            script_conf = float(osd['script_conf']),
+        )
+
+
+_backend: Optional[OCRBackend] = None
+_backend_lock = threading.Lock()
+
+
+def _create_backend(name: str) -> OCRBackend:
+    if name == 'pytesseract':
+        return PytesseractBackend()
+    if name == 'tesserocr':
+        return TesserocrBackend()
+    if name == 'auto':
+        try:
+            return TesserocrBackend()
+        except ImportError:
+            return PytesseractBackend()
+    raise ValueError(f"Unknown OCR backend: {name}")
+
+
+def get_backend() -> OCRBackend:
+    """ Process-wide OCR backend from OCR_BACKEND (default auto)
+
+    Created on first use in each process, so forked OCR pool workers build
+    (and keep) their own engines.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = _create_backend(os.getenv('OCR_BACKEND', 'auto'))
+        return _backend
+
+
+def _reset_after_fork():
+    """ Forked workers build their own engines (and must not inherit a held lock) """
+    global _backend, _backend_lock
+    _backend = None
+    _backend_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# Clockwise rotation -> PIL transpose (PIL's ROTATE_* turn counter-clockwise)
+_CLOCKWISE = {
+    90: Image.Transpose.ROTATE_270,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_90,
+}
+
+
+def _detect_setting() -> str:
+    return os.getenv('OCR_DETECT_SCRIPT', 'auto').lower()
+
+
+def detect_script_enabled() -> bool:
+    """ Run OSD before OCR of every image / page (OCR_DETECT_SCRIPT = auto | true | false)
+
+    auto (default) detects per page only with the tesserocr backend, where
+    OSD is a cheap in-process call. With pytesseract it is a second
+    tesseract subprocess per image / page, which costs more than it saves,
+    so auto detects the script once per document instead (document_lang()).
+    """
+    setting = _detect_setting()
+    if setting == 'auto':
+        return get_backend().name == TesserocrBackend.name
+    return setting in ('1', 'true', 'yes')
+
+
+def _thumbnail_osd(image: Image.Image) -> Optional[OSDResult]:
+    """ OSD on a copy of the image scaled down to OSD_MAX_SIDE """
+    thumbnail = image.copy()
+    thumbnail.thumbnail((OSD_MAX_SIDE, OSD_MAX_SIDE))
+    return get_backend().detect_osd(thumbnail)
+
+
+def _script_lang(osd: Optional[OSDResult], default_lang: str) -> str:
+    """ Language packs for the detected script, default_lang if inconclusive """
+    if osd is None or osd.script_conf < MIN_SCRIPT_CONF:
+        return default_lang
+    return SCRIPT_LANGS.get(osd.script, default_lang)
+
+
+def document_lang(image: Image.Image, default_lang: str = MULTI_LANG) -> str:
+    """ Language packs for a whole document, from one OSD of its first page
+    to OCR (e.g. a thumbnail of the first scanned page)
+
+    Only in auto mode without per-page detection (pytesseract): one
+    detection per document keeps English documents off the slower
+    multi-language models. Otherwise default_lang - per-page detection
+    (or none, with OCR_DETECT_SCRIPT=false) decides.
+
+    Args : image - first page / frame to OCR, any size
+           default_lang - language packs when detection is inconclusive
+    Returns : lang for recognise(default_lang=...) of every page
+    """
+    if _detect_setting() != 'auto' or detect_script_enabled():
+        return default_lang
+    return _script_lang(_thumbnail_osd(image), default_lang)
+
+
+def detect_layout(image: Image.Image, default_lang: str = MULTI_LANG) -> Tuple[Optional[Image.Transpose], str]:
+    """ Rotation and language packs for the image, from OSD on a thumbnail
+
+    Args : image - preprocessed image about to be OCR'd
+           default_lang - language packs when detection is turned off,
+                          inconclusive (too little text, low script
+                          confidence) or finds a script we have no packs for
+    Returns : (transpose to make it upright or None, lang)
+    """
+    if not detect_script_enabled():
+        return None, default_lang
+
+    osd = _thumbnail_osd(image)
+    if osd is None:
+        return None, default_lang
+
+    transpose = None
+    if osd.orientation_conf >= MIN_ORIENTATION_CONF:
+        transpose = _CLOCKWISE.get(osd.rotate)
+    return transpose, _script_lang(osd, default_lang)
+
+
+def better(first: OCRResult, second: OCRResult) -> OCRResult:
+    """ The higher-confidence of two reads (first on a tie) """
+    return second if second.confidence > first.confidence else first
+
+
+def _retry_line(line: OCRLine, alternative: Image.Image, lang: str) -> OCRLine:
+    """ Re-OCR one line from the alternative image, keep the better read """
+    left, top, right, bottom = line.box
+    box = (
+        max(0, left - LINE_PADDING),
+        max(0, top - LINE_PADDING),
+        min(alternative.width, right + LINE_PADDING),
+        min(alternative.height, bottom + LINE_PADDING),
+    )
+    retry = get_backend().image_to_data(alternative.crop(box), lang=lang, psm=LINE_PSM)
+    if not retry.lines or retry.confidence <= line.confidence:
+        return line
+
+    line_number = line.words[0].line
+    words = [
+        OCRWord(
+            text = word.text,
+            confidence = word.confidence,
+            box = (word.box[0] + box[0], word.box[1] + box[1], word.box[2] + box[0], word.box[3] + box[1]),
+            block = line.block,
+            line = line_number,
+        )
+        for retry_line in retry.lines for word in retry_line.words
+    ]
+    return OCRLine(words=words, block=line.block)
+
+
+def recognise(
+    image: Image.Image,
+    alternative: Optional[Image.Image] = None,
+    default_lang: str = MULTI_LANG,
+    psm: int = DEFAULT_PSM,
+) -> OCRResult:
+    """ Orient, OCR once with word confidences, re-OCR what scored low
+
+    Args : image - preprocessed image
+           alternative - same geometry, different preprocessing (e.g. not
+                         contrast-enhanced), used for the retries; None = no retry
+           default_lang - language packs when script detection is off or
+                          inconclusive (e.g. from document_lang())
+           psm - page segmentation mode of the main pass
+    Returns : OCRResult
+    """
+    transpose, lang = detect_layout(image, default_lang)
+    if transpose is not None:
+        image = image.transpose(transpose)
+        if alternative is not None:
+            alternative = alternative.transpose(transpose)
+
+    backend = get_backend()
+    result = backend.image_to_data(image, lang=lang, psm=psm)
+    if alternative is None:
+        return result
+
+    # Nothing read at all - one full retry with automatic segmentation
+    if not result.lines:
+        metrics.count('ocr_retries')
+        return better(result, backend.image_to_data(alternative, lang=lang, psm=AUTO_PSM))
+
+    low = result.low_confidence_lines()
+    if not low:
+        return result
+    metrics.count('ocr_low_confidence_lines', len(low))
+
+    if len(low) > MAX_RETRY_LINES:
+        metrics.count('ocr_retries')
+        return better(result, backend.image_to_data(alternative, lang=lang, psm=psm))
+
+    lines = list(result.lines)
+    for i in low:
+        lines[i] = _retry_line(lines[i], alternative, lang)
+    return OCRResult(lines=lines)
@@ -0,0 +1,136 @@
+import itertools
+import multiprocessing
+import multiprocessing.util
+import os
+import pickle
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, Sequence
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_workers: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_workers() -> int:
+    """ OCR worker processes (OCR_WORKERS env, default CPU count) """
+    if _workers is not None:
+        return _workers
+    return max(1, int(os.getenv('OCR_WORKERS', os.cpu_count() or 1)))
+
+
+def configure(workers: int):
+    """ Set the worker count for this process (1 = OCR inline, no pool)
+
+    Used (through init_worker) by the pipeline's extraction processes so
+    nested pools do not multiply the process count.
+    """
+    global _workers
+    _workers = max(1, workers)
+
+
+def init_worker(workers: int):
+    """ Initializer for another pool's processes that run loaders (the
+    pipeline's extraction processes): OCR with `workers` processes of their own
+
+    Pool processes exit without atexit hooks, and multiprocessing then
+    waits for all their children, so a nested OCR pool left running would
+    block the outer pool's shutdown forever. A multiprocessing finalizer
+    stops it first - with a priority above the queue finalizers (10), which
+    would otherwise close the queue the stop signals go through.
+    """
+    configure(workers)
+    multiprocessing.util.Finalize(None, shutdown, exitpriority=100)
+
+
+def mp_context():
+    """ Start method for worker processes
+
+    Pools are created lazily inside threaded processes (web workers with
+    request, warm-up and LLM threads), where fork() can copy a lock held by
+    another thread. forkserver (spawn where unavailable) starts clean
+    processes; every task is a module-level function, so nothing relies on
+    inherited state.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    if get_workers() <= 1:
+        return None
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=get_workers(), mp_context=mp_context())
+        return _executor
+
+
+def shutdown():
+    """ Stop the pool (recreated on next use) """
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+
+def _call(func: Callable, args: Sequence[Any]) -> Any:
+    """ Run func(*args), returning (not raising) any exception
+
+    Some exceptions (e.g. pytesseract's) cannot be unpickled in the parent,
+    which would break the whole pool - those come back as RuntimeError.
+    """
+    try:
+        return func(*args)
+    except Exception as e:
+        try:
+            pickle.loads(pickle.dumps(e))
+        except Exception:
+            return RuntimeError(f"{type(e).__name__}: {e}")
+        return e
+
+
+def imap_ordered(func: Callable, arg_list: Iterable[Sequence[Any]]) -> Iterator[Any]:
+    """ Run func(*args) for each args in the shared OCR pool, yielding
+    results in input order as soon as each one (and those before it) is done.
+
+    A call that raises yields its exception instead, so one bad page does not
+    lose the others. func must be a module-level (picklable) function.
+    arg_list is consumed lazily, at most 2 x workers calls ahead of the
+    consumer, so large inputs (e.g. image frames) are not all held at once.
+    """
+    executor = _get_executor()
+    if executor is None:
+        for args in arg_list:
+            yield _call(func, args)
+        return
+
+    window = 2 * get_workers()
+    pending: Deque[Future] = deque()
+    args_iter = iter(arg_list)
+    try:
+        for args in itertools.islice(args_iter, window):
+            pending.append(executor.submit(_call, func, args))
+        while pending:
+            future = pending.popleft()
+            try:
+                result = future.result()
+            except Exception as e:
+                # Pool-level failure (worker died, cancelled)
+                result = e
+            # Refill before yielding so the pool stays busy meanwhile
+            for args in itertools.islice(args_iter, 1):
+                pending.append(executor.submit(_call, func, args))
+            yield result
+    finally:
+        # Consumer stopped early - do not leave queued pages behind
+        for future in pending:
+            future.cancel()
+
+
+def map_ordered(func: Callable, arg_list: Iterable[Sequence[Any]]) -> List[Any]:
+    """ List version of imap_ordered() """
+    return list(imap_ordered(func, arg_list))
@@ -0,0 +1,236 @@
+"""
+Vectorised image preprocessing for OCR, shared by the image and PDF loaders.
+
+Same steps (and, within rounding, the same output) as the PIL ImageEnhance
+based code it replaces, but every step is a NumPy array operation instead of
+a per-pixel Python pass.
+"""
+import math
+import os
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+
+# Pixels darker than this count as content when cropping margins
+CROP_THRESHOLD = 250
+CROP_PADDING = 20
+
+CONTRAST = 2.0
+SHARPNESS = 1.5
+
+# Resolution normalisation: text lines are scaled down to about this height
+# (10-11pt text at 300 DPI), and no image is OCR'd above OCR_MAX_PIXELS
+TARGET_LINE_HEIGHT = int(os.getenv('OCR_TARGET_LINE_HEIGHT', 40))
+MAX_PIXELS = int(os.getenv('OCR_MAX_PIXELS', 10_000_000))
+# Line height is measured on a copy no larger than this (longest side)
+ESTIMATE_MAX_SIDE = 2000
+
+
+def to_gray(img: Image.Image) -> np.ndarray:
+    """ (height, width) uint8 array of the image in grayscale """
+    if img.mode != 'L':
+        img = img.convert('L')
+    return np.asarray(img)
+
+
+def is_dark(pixels: np.ndarray) -> bool:
+    """ Predominantly dark image (light text on a dark background) """
+    return pixels.size > 0 and float(pixels.mean()) < 128
+
+
+def content_bbox(
+    pixels: np.ndarray,
+    threshold: int = CROP_THRESHOLD,
+    padding: int = CROP_PADDING,
+) -> Optional[Tuple[int, int, int, int]]:
+    """ Box around the non-near-white pixels, plus padding
+
+    Returns : (left, top, right, bottom) or None for an empty page
+    """
+    mask = pixels < threshold
+    rows = np.flatnonzero(mask.any(axis=1))
+    if not rows.size:
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+
+    height, width = pixels.shape
+    return (
+        max(0, int(cols[0]) - padding),
+        max(0, int(rows[0]) - padding),
+        min(width, int(cols[-1]) + 1 + padding),
+        min(height, int(rows[-1]) + 1 + padding),
+    )
+
+
+def otsu_threshold(pixels: np.ndarray) -> int:
+    """ Gray level that best splits the histogram into ink and background """
+    histogram = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight = np.cumsum(histogram)
+    total = weight[-1]
+    cumulative_mean = np.cumsum(histogram * levels)
+    background = total - weight
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_low = cumulative_mean / weight
+        mean_high = (cumulative_mean[-1] - cumulative_mean) / background
+        between = weight * background * (mean_low - mean_high) ** 2
+    return int(np.argmax(np.nan_to_num(between)))
+
+
+def estimate_line_height(pixels: np.ndarray) -> Optional[float]:
+    """ Median text line height in pixels, from the horizontal projection
+    profile (rows that contain ink, grouped into runs)
+
+    Returns : None when no line structure is found (photos, blank images)
+    """
+    height = pixels.shape[0]
+    threshold = otsu_threshold(pixels)
+    ink = pixels > threshold if is_dark(pixels) else pixels <= threshold
+
+    # Any real ink in the row (a few stray pixels are noise), so a line
+    # spans ascenders to descenders regardless of how long it is
+    rows = ink.sum(axis=1) > max(2, pixels.shape[1] // 500)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], rows.astype(np.int8), [0]))))
+    runs = edges[1::2] - edges[0::2]
+    # Drop specks and blocks too tall to be a text line
+    runs = runs[(runs >= 3) & (runs <= height // 4)]
+    if runs.size < 3:
+        return None
+    return float(np.median(runs))
+
+
+def normalise_resolution(image: Image.Image) -> Tuple[Image.Image, float]:
+    """ Downscale oversized images before OCR
+
+    Scales so text lines are about TARGET_LINE_HEIGHT pixels tall (estimated
+    from the image) and the image has at most MAX_PIXELS. Never upscales.
+
+    Returns : (image, scale) - scale 1.0 means no resampling
+    """
+    if image.mode not in ('L', 'RGB', 'RGBA'):
+        # Palette / 1-bit (fax) / 16-bit images - OCR works on gray anyway
+        image = image.convert('L')
+
+    width, height = image.size
+    scale = min(1.0, math.sqrt(MAX_PIXELS / float(width * height)))
+
+    # Measure on a small copy - line structure survives the reduction
+    factor = max(1, math.ceil(max(width, height) / ESTIMATE_MAX_SIDE))
+    sample = image.reduce(factor) if factor > 1 else image
+    line_height = estimate_line_height(to_gray(sample))
+    if line_height is not None:
+        scale = min(scale, TARGET_LINE_HEIGHT / (line_height * factor))
+
+    if scale >= 0.95:
+        return image, 1.0
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0), scale
+
+
+def _blend(degenerate: np.ndarray, pixels: np.ndarray, factor: float) -> np.ndarray:
+    """ degenerate + factor * (pixels - degenerate), clipped (Image.blend) """
+    out = degenerate + np.float32(factor) * (pixels.astype(np.float32) - degenerate)
+    return np.clip(out, 0, 255).astype(np.uint8)
+
+
+def contrast_lut(mean: float, factor: float) -> np.ndarray:
+    """ 256-entry lookup table for contrast
+
+    Contrast only depends on the pixel value and the image mean, so it is
+    applied as a single table lookup.
+    """
+    values = np.arange(256, dtype=np.float32)
+    return _blend(np.float32(int(mean + 0.5)), values, factor)
+
+
+# SMOOTH kernel sum (0 .. 13 * 255) -> rounded smoothed pixel
+_SMOOTH_ROUND = np.floor(np.arange(13 * 255 + 1, dtype=np.float64) / 13 + 0.5).astype(np.uint8)
+
+
+@lru_cache(maxsize=8)
+def _blend_table(factor: float) -> np.ndarray:
+    """ Flat 256 x 256 table: [smoothed << 8 | pixel] -> blended pixel """
+    smooth, pixel = np.meshgrid(np.arange(256, dtype=np.float32), np.arange(256, dtype=np.float32), indexing='ij')
+    return _blend(smooth, pixel, factor).ravel()
+
+
+def sharpen(pixels: np.ndarray, factor: float = SHARPNESS) -> np.ndarray:
+    """ Blend with the 3x3 smoothed image (ImageEnhance.Sharpness)
+
+    Smoothing kernel is PIL's SMOOTH: all ones, centre 5, scale 13. Border
+    pixels are left as they are, like PIL's filter. Everything stays in
+    integers: the kernel sum and the blend are table lookups.
+    """
+    height, width = pixels.shape
+    if height < 3 or width < 3:
+        return pixels.copy()
+
+    wide = pixels.astype(np.uint16)
+    # Separable 3x3 box sum (max 9 * 255, fits uint16), then add 4x centre
+    rows = wide[:, :-2] + wide[:, 1:-1]
+    rows += wide[:, 2:]
+    total = rows[:-2] + rows[1:-1]
+    total += rows[2:]
+    centre = wide[1:-1, 1:-1]
+    total += centre << 2
+
+    index = _SMOOTH_ROUND[total].astype(np.uint16)
+    index <<= 8
+    index |= centre
+
+    out = pixels.copy()
+    out[1:-1, 1:-1] = _blend_table(float(factor))[index]
+    return out
+
+
+def prepare_gray(
+    image: Union[Image.Image, np.ndarray],
+    crop: bool = False,
+    invert_dark: bool = False,
+) -> np.ndarray:
+    """ Grayscale -> optional margin crop -> optional inversion of dark images
+
+    Args : image - PIL image (any mode) or a (height, width) uint8
+                   grayscale array, e.g. a view on a pixmap buffer
+           crop - crop white margins around the content
+           invert_dark - invert predominantly dark images
+    Returns : uint8 array (may be a view on the input)
+    """
+    pixels = image if isinstance(image, np.ndarray) else to_gray(image)
+
+    if crop:
+        bbox = content_bbox(pixels)
+        if bbox:
+            left, top, right, bottom = bbox
+            pixels = pixels[top:bottom, left:right]
+
+    if invert_dark and is_dark(pixels):
+        pixels = 255 - pixels
+    return pixels
+
+
+def enhance(pixels: np.ndarray, contrast: float = CONTRAST, sharpness: float = SHARPNESS) -> Image.Image:
+    """ Contrast then sharpening of a grayscale array
+
+    Returns : new 'L' image
+    """
+    if not pixels.size:
+        return Image.fromarray(np.ascontiguousarray(pixels))
+
+    pixels = contrast_lut(float(pixels.mean()), contrast)[pixels]
+    pixels = sharpen(pixels, sharpness)
+    return Image.fromarray(pixels)
+
+
+def preprocess_for_ocr(
+    image: Union[Image.Image, np.ndarray],
+    crop: bool = False,
+    invert_dark: bool = False,
+    contrast: float = CONTRAST,
+    sharpness: float = SHARPNESS,
+) -> Image.Image:
+    """ prepare_gray() then enhance() - the full preprocessing for OCR """
+    return enhance(prepare_gray(image, crop=crop, invert_dark=invert_dark), contrast, sharpness)
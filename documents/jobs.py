@@ -0,0 +1,206 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class JobStore:
+    """ Durable job queue + results in a local SQLite file.
+
+    A job is a group of uploaded documents. Each document is queued on its
+    own so several workers can share one job:
+
+        queued -> processing -> done
+
+    Workers refresh the claim of documents they are still processing
+    (heartbeat()); documents left in 'processing' by a crashed worker stop
+    being refreshed and are put back in the queue by requeue_stale().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " total INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_documents ("
+            " job_id TEXT NOT NULL REFERENCES jobs(id),"
+            " idx INTEGER NOT NULL,"
+            " filename TEXT NOT NULL,"
+            " content BLOB,"
+            " status TEXT NOT NULL DEFAULT 'queued',"
+            " result TEXT,"
+            " queued_at REAL NOT NULL,"
+            " claimed_at REAL,"
+            " PRIMARY KEY (job_id, idx))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS job_documents_queue ON job_documents (status, queued_at)")
+
+    def enqueue(self, files: List[Tuple[str, bytes]]) -> str:
+        """ Queue a job
+
+        Args : files - list of (filename, content)
+
+        Returns : job id
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, created_at, total) VALUES (?, ?, ?)",
+                    (job_id, now, len(files)),
+                )
+                self._conn.executemany(
+                    "INSERT INTO job_documents (job_id, idx, filename, content, queued_at) VALUES (?, ?, ?, ?, ?)",
+                    [(job_id, i, filename, content, now) for i, (filename, content) in enumerate(files)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """ Take the oldest queued document and mark it processing
+
+        Returns : dict with job_id, index, filename, content - or None if queue is empty
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT job_id, idx, filename, content FROM job_documents"
+                    " WHERE status = 'queued' ORDER BY queued_at, idx LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE job_documents SET status = 'processing', claimed_at = ?"
+                        " WHERE job_id = ? AND idx = ?",
+                        (time.time(), row[0], row[1]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        return {"job_id": row[0], "index": row[1], "filename": row[2], "content": row[3]}
+
+    def complete(self, job_id: str, index: int, result: Dict[str, Any]):
+        """ Store a document result and drop its uploaded content """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_documents SET status = 'done', result = ?, content = NULL"
+                " WHERE job_id = ? AND idx = ?",
+                (json.dumps(result), job_id, index),
+            )
+
+    def heartbeat(self, claims: List[Tuple[str, int]]):
+        """ Refresh claimed_at of documents still being processed, so
+        requeue_stale() leaves them alone
+
+        Args : claims - list of (job_id, index)
+        """
+        if not claims:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE job_documents SET claimed_at = ?"
+                " WHERE job_id = ? AND idx = ? AND status = 'processing'",
+                [(now, job_id, index) for job_id, index in claims],
+            )
+
+    def requeue_stale(self, older_than: float) -> int:
+        """ Put documents whose claim was not refreshed for more than
+        older_than seconds back in the queue
+
+        Returns : number of documents requeued
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE job_documents SET status = 'queued', claimed_at = NULL"
+                " WHERE status = 'processing' AND claimed_at < ?",
+                (time.time() - older_than,),
+            )
+            return cursor.rowcount
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """ Job progress and per-document results, None if job is unknown """
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT id, created_at, total FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT idx, filename, status, result FROM job_documents WHERE job_id = ? ORDER BY idx",
+                (job_id,),
+            ).fetchall()
+
+        documents = []
+        completed = successful = 0
+        for idx, filename, doc_status, result in rows:
+            result = json.loads(result) if result else None
+            if doc_status == 'done':
+                completed += 1
+                successful += result is not None and result.get('error') is None
+            documents.append({"index": idx, "source": filename, "status": doc_status, "result": result})
+
+        total = job[2]
+        if completed == total:
+            job_status = 'completed'
+        elif completed or any(d["status"] == 'processing' for d in documents):
+            job_status = 'running'
+        else:
+            job_status = 'queued'
+
+        return {
+            "job_id": job[0],
+            "status": job_status,
+            "created_at": job[1],
+            "progress": {
+                "total": total,
+                "completed": completed,
+                "successful": successful,
+                "failed": completed - successful,
+            },
+            "documents": documents,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_store: Optional[JobStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """ Process-wide JobStore at JOBS_DB_PATH (default .data/jobs.sqlite3 in project root) """
+    global _shared_store
+
+    with _shared_lock:
+        if _shared_store is None:
+            default_path = os.path.join(
+                os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.data', 'jobs.sqlite3'
+            )
+            _shared_store = JobStore(os.getenv('JOBS_DB_PATH', default_path))
+        return _shared_store
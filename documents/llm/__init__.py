@@ -1,30 +1,109 @@
 import os
+from typing import Dict, Optional
 
 
-def get_llm():
+def get_llm_settings() -> Dict[str, str]:
+    """Get provider and model name from env config
+
+    Returns : dict with 'provider', 'model' and 'cascade_model'
+              ('' when no cascade model is configured)
+    """
+
+    provider = os.getenv('LLM_PROVIDER', 'ollama')
+
+    if provider == 'ollama':
+        model = os.getenv('OLLAMA_MODEL', 'llama3.1:8b')
+    elif provider == 'groq':
+        model = 'llama-3.1-70b-versatile'
+    elif provider == 'fake':
+        model = 'fake'
+    else:
+        raise ValueError(f"Unknown LLM Provider: {provider}")
+
+    return {'provider': provider, 'model': model, 'cascade_model': os.getenv('LLM_CASCADE_MODEL', '')}
+
+
+# Context window per provider when LLM_CONTEXT_TOKENS is not set. For Ollama
+# this is also sent as num_ctx - the server default (2048-4096) is far below
+# what llama3.1 supports and silently truncates longer prompts
+DEFAULT_CONTEXT_TOKENS = {
+    'ollama': 8192,
+    'groq': 131072,
+    'fake': 8192,
+}
+
+
+def get_context_tokens() -> int:
+    """Context window of the configured model, in tokens (LLM_CONTEXT_TOKENS)"""
+    provider = get_llm_settings()['provider']
+    return int(os.getenv('LLM_CONTEXT_TOKENS', DEFAULT_CONTEXT_TOKENS[provider]))
+
+
+def _http_limits():
+    """Connection pool limits for the provider HTTP client
+
+    The client (and its keep-alive connections) lives as long as the LLM
+    object, so share the LLM object instead of re-creating it per request.
+    """
+    import httpx
+
+    max_connections = int(os.getenv('LLM_MAX_CONNECTIONS', 20))
+    return httpx.Limits(
+        max_connections = max_connections,
+        max_keepalive_connections = max_connections,
+        keepalive_expiry = 300,
+    )
+
+
+def get_llm(model: Optional[str] = None):
     """Get LLM based on env config
     
     Set LLM_provider env var to : ollama , 'groq' or etc
+    ('fake' = offline canned responses for tests/benchmarks)
     Default: ollama
+
+    Args : model - model name on the configured provider (default: the
+           provider's configured model)
     """
 
-    provider = os.getenv('LLM_PROVIDER', 'ollama')
+    settings = get_llm_settings()
+    provider = settings['provider']
+    model = model or settings['model']
 
     if provider == 'ollama':
         from langchain_ollama import ChatOllama
         return ChatOllama(
-            model = os.getenv('OLLAMA_MODEL', 'llama3.1:8b'),
+            model = model,
             base_url = os.getenv('OLLAMA_BASE_URL' , 'http://localhost:11434'),
-            temperature = 0.1
+            temperature = 0.1,
+            # Keep model resident between requests instead of unloading after 5 min idle
+            keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', '30m'),
+            num_ctx = get_context_tokens(),
+            client_kwargs = {'limits': _http_limits()},
         )
 
     elif provider == 'groq':
+        import httpx
         from langchain_groq import ChatGroq
         return ChatGroq(
-            model = 'llama-3.1-70b-versatile',
+            model = model,
             api_key = os.getenv('GROQ_API_KEY'),
-            temperature = 0
+            temperature = 0,
+            http_client = httpx.Client(limits=_http_limits()),
+            http_async_client = httpx.AsyncClient(limits=_http_limits()),
         )
 
+    elif provider == 'fake':
+        from .fake import FakeChatModel
+        return FakeChatModel(latency = float(os.getenv('FAKE_LLM_LATENCY', 0)))
+
     raise ValueError(f"Unknown LLM Provider: {provider}")
 
+
+def get_cascade_llm():
+    """Small model tried before the configured one (LLM_CASCADE_MODEL, same provider)
+
+    Returns : chat model, or None when no cascade model is configured
+    """
+    model = get_llm_settings()['cascade_model']
+    return get_llm(model) if model else None
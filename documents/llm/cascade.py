@@ -0,0 +1,100 @@
+"""
+Small-model-first cascade.
+
+A small, fast model answers each chunk first. The chunk is escalated to the
+configured (large) model only when that answer is not good enough:
+
+- the call or its structured output failed (schema validation)
+- dates are not ISO YYYY-MM-DD
+- confidence is below LLM_CASCADE_MIN_CONFIDENCE
+- the text has an expiry / issue date cue but the date was not returned
+
+Outcomes are counted per document_type in doc_pipeline_cascade_total (types
+outside the prompt's class list are counted as 'other').
+"""
+import os
+import re
+from typing import Any, Dict, Optional
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from documents import metrics
+from documents.metrics import REGISTRY
+from .relevance import ACTIVATION_CUES, EXPIRY_CUES, cue_pattern
+from .schema import DOCUMENT_TYPES, DocumentExtraction
+
+
+MIN_CONFIDENCE = float(os.getenv('LLM_CASCADE_MIN_CONFIDENCE', 0.7))
+
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_EXPIRY = cue_pattern(EXPIRY_CUES)
+_ACTIVATION = cue_pattern(ACTIVATION_CUES)
+
+
+def escalation_reason(result: Any, text: str) -> Optional[str]:
+    """ Why the small model's answer for text is not good enough
+
+    Returns : reason, or None to accept the answer
+    """
+    if not isinstance(result, DocumentExtraction):
+        return 'invalid'
+    for value in (result.expiry_date, result.activation_date):
+        if value and not _ISO_DATE.match(value):
+            return 'invalid'
+    if result.confidence < MIN_CONFIDENCE:
+        return 'low_confidence'
+    if not result.expiry_date and _EXPIRY.search(text):
+        return 'missing_expiry'
+    if not result.activation_date and _ACTIVATION.search(text):
+        return 'missing_activation'
+    return None
+
+
+def _record(result: Any, reason: Optional[str]):
+    """ Count the outcome for the small model's document type """
+    if isinstance(result, DocumentExtraction):
+        # Free text from the model - keep the metric label to the known classes
+        document_type = result.document_type.strip().lower()
+        if document_type not in DOCUMENT_TYPES:
+            document_type = 'other'
+    else:
+        document_type = 'unknown'
+    outcome = 'escalated' if reason else 'accepted'
+    REGISTRY.inc(
+        'cascade_total', 1, "Small model answers accepted / escalated to the large model",
+        document_type=document_type, outcome=outcome,
+    )
+    if reason:
+        metrics.count('llm_escalations')
+        metrics.event('cascade_escalated', document_type=document_type, reason=reason)
+
+
+def build(prompt: ChatPromptTemplate, small: Runnable, large: Runnable) -> Runnable:
+    """ {"text": chunk} -> DocumentExtraction, small model first
+
+    Args : prompt - extraction prompt
+           small, large - structured output runnables (messages -> DocumentExtraction)
+    """
+    small_chain = prompt | small
+    large_chain = prompt | large
+
+    def run(inputs: Dict[str, str]) -> DocumentExtraction:
+        try:
+            result = small_chain.invoke(inputs)
+        except Exception as e:
+            result = e
+        reason = escalation_reason(result, inputs["text"])
+        _record(result, reason)
+        return large_chain.invoke(inputs) if reason else result
+
+    async def arun(inputs: Dict[str, str]) -> DocumentExtraction:
+        try:
+            result = await small_chain.ainvoke(inputs)
+        except Exception as e:
+            result = e
+        reason = escalation_reason(result, inputs["text"])
+        _record(result, reason)
+        return await large_chain.ainvoke(inputs) if reason else result
+
+    return RunnableLambda(run, afunc=arun, name="cascade")
@@ -0,0 +1,93 @@
+import asyncio
+import itertools
+import re
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import PrivateAttr
+
+from .schema import DocumentExtraction, DocumentExtractionList, PackedExtraction
+
+
+DEFAULT_EXTRACTION = DocumentExtraction(
+    document_type="other",
+    extracted_fields={"name": "Test Holder"},
+    expiry_date="2028-09-01",
+    activation_date="2025-09-01",
+    summary="Canned extraction from the fake LLM.",
+    confidence=0.9,
+)
+
+
+class FakeChatModel(BaseChatModel):
+    """ Offline stand-in for ChatOllama/ChatGroq (tests and benchmarks)
+
+    Structured output returns the canned extractions in turn (one per
+    document for packed requests), after an artificial per-call latency.
+    Select it with LLM_PROVIDER=fake (FAKE_LLM_LATENCY sets the latency in
+    seconds) or pass it to LLMProcessor.
+    """
+
+    latency: float = 0.0
+    responses: List[DocumentExtraction] = [DEFAULT_EXTRACTION]
+
+    _calls: int = PrivateAttr(default=0)
+    _cycle: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def calls(self) -> int:
+        """ Number of structured extraction calls made so far """
+        return self._calls
+
+    def _next_response(self) -> DocumentExtraction:
+        with self._lock:
+            if self._cycle is None:
+                self._cycle = itertools.cycle(self.responses)
+            return next(self._cycle).model_copy(deep=True)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="OK"))])
+
+    def _answer(self, schema: Any, messages: Any) -> Any:
+        with self._lock:
+            self._calls += 1
+        if schema is DocumentExtractionList:
+            # Packed request - one canned response per delimited document
+            if hasattr(messages, 'to_string'):
+                text = messages.to_string()
+            else:
+                text = "\n".join(str(getattr(message, 'content', message)) for message in messages)
+            return DocumentExtractionList(documents=[
+                PackedExtraction(document_id=int(document_id), **self._next_response().model_dump())
+                for document_id in re.findall(r'<document id="(\d+)">', text)
+            ])
+        return self._next_response()
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Runnable:
+        def extract(messages: Any) -> Any:
+            time.sleep(self.latency)
+            return self._answer(schema, messages)
+
+        async def aextract(messages: Any) -> Any:
+            await asyncio.sleep(self.latency)
+            return self._answer(schema, messages)
+
+        return RunnableLambda(extract, afunc=aextract)
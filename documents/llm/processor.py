@@ -1,28 +1,42 @@
-from typing import List
+import asyncio
+import contextvars
+import hashlib
+import heapq
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from .import get_llm
-from .schema import DocumentExtraction
+from documents import metrics
+from .import cascade, get_cascade_llm, get_context_tokens, get_llm, rules, tokens
+from .relevance import ACTIVATION_CUES, EARLY_STOP_CONFIDENCE, EXPIRY_CUES, EarlyStop, chunk_relevance, early_stop_enabled, rank_chunks
+from .schema import DOCUMENT_TYPES, DocumentExtraction, DocumentExtractionList, PackedExtraction
+
+
+def _quoted(cues) -> str:
+    return ", ".join(f'"{cue}"' for cue in cues)
 
 
 EXTRACTION_PROMPT = """You are a document extraction expert. Analyze this document and extract structured information.
 
 Document text:
-{text}
+{{text}}
 
 Instructions:
-1. document_type: Classify as one of: driver_license, passport, invoice, insurance_card, certificate, contract, id_card, credit_card, other
+1. document_type: Classify as one of: {document_types}
 
 2. extracted_fields: Extract key fields as a dictionary (names, numbers, amounts, identifiers). 
    DO NOT include expiry_date or activation_date here - those have their own dedicated fields below.
 
-3. expiry_date: REQUIRED if any expiration date exists. Look for: "Valid Through", "Valid Thru", "Expires", "Expiry", "Exp", "Good Through", "MM/YY" format near "Valid".
+3. expiry_date: REQUIRED if any expiration date exists. Look for: {expiry_cues}, "MM/YY" format near "Valid".
    Convert to ISO format YYYY-MM-DD:
    - "09/28" or "09/2028" → "2028-09-01"
    - "09/15/2027" → "2027-09-15"
    Return null ONLY if absolutely no expiration date exists.
 
-4. activation_date: REQUIRED if any issue/start date exists. Look for: "Issue Date", "Issued", "Start Date", "Effective Date", "Created".
+4. activation_date: REQUIRED if any issue/start date exists. Look for: {activation_cues}.
    Convert to ISO format YYYY-MM-DD.
    Return null ONLY if absolutely no issue/start date exists.
 
@@ -31,68 +45,490 @@ Instructions:
 6. confidence: 0.0-1.0 based on extraction quality.
 
 CRITICAL: The expiry_date and activation_date fields MUST be populated directly - do NOT put these dates only in extracted_fields.
+""".format(
+    document_types=", ".join(DOCUMENT_TYPES), expiry_cues=_quoted(EXPIRY_CUES), activation_cues=_quoted(ACTIVATION_CUES),
+)
+
+# Several small documents in one request - same instructions, applied per document
+PACKED_PROMPT = """You are a document extraction expert. Analyze each of the {count} documents below separately and extract structured information for each one.
+
+Each document is between <document id="N"> and </document> tags. The documents are unrelated: never mix fields or dates between them.
+
+{documents}
+
+Instructions (apply to every document):
+""" + EXTRACTION_PROMPT.split("Instructions:\n", 1)[1] + """
+Return exactly {count} extractions in documents, one per document. Set document_id of each extraction to the id of the document it describes.
 """
 
+# Changes whenever the prompt text changes - used to invalidate cached results
+PROMPT_VERSION = hashlib.sha256((EXTRACTION_PROMPT + PACKED_PROMPT).encode('utf-8')).hexdigest()[:12]
+
+
 class LLMProcessor:
     """ Processes extracted text through LLM with chunking support. """
 
-    def __init__(self, chunk_size: int = 3000, chunk_overlap: int = 200):
-        self.llm = get_llm()
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        llm: Optional[BaseChatModel] = None,
+        use_rules: Optional[bool] = None,
+        context_tokens: Optional[int] = None,
+        small_llm: Optional[BaseChatModel] = None,
+    ):
+        """
+        Args:
+            chunk_size      : Max characters per chunk. Default: sized in tokens
+                              to fit the model context (see context_tokens)
+            chunk_overlap   : Shared between neighbouring chunks - characters
+                              with chunk_size, else tokens (LLM_CHUNK_OVERLAP_TOKENS)
+            max_concurrency : Max chunk LLM calls in flight per document
+                              (default: LLM_MAX_CONCURRENCY or 4)
+            llm             : Chat model to use (default: get_llm())
+            use_rules       : Try the rule-based fast path before the LLM
+                              (default: LLM_RULES or True)
+            context_tokens  : Model context window for token-sized chunks
+                              (default: LLM_CONTEXT_TOKENS / provider default)
+            small_llm       : Model tried first, escalating to llm when its answer
+                              is not good enough (default: LLM_CASCADE_MODEL, or none)
+        """
+        if chunk_size is not None:
+            # Fixed character chunks
+            self.length = len
+            self.chunk_size = chunk_size
+            chunk_overlap = 200 if chunk_overlap is None else chunk_overlap
+            self.output_per_document = int(tokens.OUTPUT_TOKENS_PER_DOCUMENT * tokens.LATIN_CHARS_PER_TOKEN)
+        else:
+            # As many tokens as fit next to the prompt and the answer
+            self.length = tokens.estimate_tokens
+            self.chunk_size = tokens.chunk_budget(context_tokens or get_context_tokens(), EXTRACTION_PROMPT)
+            chunk_overlap = tokens.CHUNK_OVERLAP_TOKENS if chunk_overlap is None else chunk_overlap
+            self.output_per_document = tokens.OUTPUT_TOKENS_PER_DOCUMENT
+
+        self.chunk_overlap = chunk_overlap
+        self.use_rules = rules.rules_enabled() if use_rules is None else use_rules
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', 4)))
+        self.llm = llm if llm is not None else get_llm()
         self.structured_llm = self.llm.with_structured_output(DocumentExtraction)
         self.prompt = ChatPromptTemplate.from_template(EXTRACTION_PROMPT)
+        self.packed_llm = self.llm.with_structured_output(DocumentExtractionList)
+        self.packed_prompt = ChatPromptTemplate.from_template(PACKED_PROMPT)
+
+        # {"text": chunk} -> DocumentExtraction; with a cascade model the
+        # small model answers first and hard chunks go on to self.llm
+        self.small_llm = small_llm if small_llm is not None else get_cascade_llm()
+        if self.small_llm is not None:
+            self.extractor = cascade.build(
+                self.prompt, self.small_llm.with_structured_output(DocumentExtraction), self.structured_llm,
+            )
+        else:
+            self.extractor = self.prompt | self.structured_llm
         
         # Text splitter for large documents
         self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
+            chunk_size=self.chunk_size,
             chunk_overlap=chunk_overlap,
+            length_function=self.length,
             separators=["\n\n", "\n", " ", ""]
         )
 
+    def settings(self) -> Dict[str, Any]:
+        """ Settings besides model and prompt that change the extraction
+        (part of the result cache key) """
+        return {
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "rules": self.use_rules and rules.MIN_CONFIDENCE,
+            "cascade": self.small_llm is not None and cascade.MIN_CONFIDENCE,
+            "early_stop": early_stop_enabled() and EARLY_STOP_CONFIDENCE,
+        }
+
     def process(self, text: str) -> DocumentExtraction:
         """ Processes text and return structured extraction
-        
+
+        Templated documents the rules engine is confident about skip the LLM.
+
         Args : Extracted text from docs
 
         Return : Document Extraction with all fields
         """
-        messages = self.prompt.format_messages(text=text)
-        result = self.structured_llm.invoke(messages)
+        fast = self._try_rules(text)
+        if fast is not None:
+            return fast
+
+        with metrics.timed('llm'):
+            result = self.extractor.invoke({"text": text})
+        return result
+
+    def warm_up(self):
+        """ Send a tiny request so the model(s) are loaded before real traffic """
+        if self.small_llm is not None:
+            self.small_llm.invoke("Reply with OK.")
+        self.llm.invoke("Reply with OK.")
+
+    async def aprocess(self, text: str) -> DocumentExtraction:
+        """ Async version of process() - uses ainvoke so no thread is blocked
+        while waiting on the LLM
+
+        Args : Extracted text from docs
+
+        Return : Document Extraction with all fields
+        """
+        fast = self._try_rules(text)
+        if fast is not None:
+            return fast
+
+        with metrics.timed('llm'):
+            result = await self.extractor.ainvoke({"text": text})
+        return result
+
+    def _try_rules(self, text: str) -> Optional[DocumentExtraction]:
+        """ Rule-based extraction when it is confident enough, else None
+
+        Only single-chunk documents get here - templated documents are short.
+        """
+        if not self.use_rules:
+            return None
+        with metrics.timed('rules'):
+            result = rules.extract(text)
+        if result.confidence < rules.MIN_CONFIDENCE:
+            metrics.count('rules_miss')
+            return None
+        metrics.count('rules_hit')
+        metrics.event('rules_hit', document_type=result.document_type, confidence=result.confidence)
         return result
 
     def process_chunked(self, text: str) -> DocumentExtraction:
         """ Process text with chunking for large documents.
         
-        Splits text into chunks, processes each, and merges results
+        Splits text into chunks, processes them concurrently (at most
+        max_concurrency LLM calls in flight), and merges results
         by picking the best extraction.
+
+        With LLM_EARLY_STOP (default on) chunks are sent most relevant first
+        (dates, date cues, identifiers) and the rest are skipped once confident
+        results agree on both dates and the document type.
         
         Args: text - Extracted text from document
         
         Returns: DocumentExtraction with best results
         """
-        chunks = self.splitter.split_text(text)
+        chunks = self._split(text)
         
         # If text fits in single chunk, process directly
         if len(chunks) <= 1:
             return self.process(text)
         
-        print(f"    [Chunking] Document split into {len(chunks)} chunks")
-        
-        # Process each chunk
+        if early_stop_enabled():
+            return self._merge_chunk_outputs(self._process_ranked(chunks))
+
+        # Process all chunks - a failed chunk comes back as its exception
+        with metrics.timed('llm'):
+            outputs = self.extractor.batch(
+                [{"text": chunk} for chunk in chunks],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True,
+            )
+        return self._merge_chunk_outputs(outputs)
+
+    async def aprocess_chunked(self, text: str) -> DocumentExtraction:
+        """ Async version of process_chunked()
+
+        Args: text - Extracted text from document
+
+        Returns: DocumentExtraction with best results
+        """
+        chunks = self._split(text)
+
+        if len(chunks) <= 1:
+            return await self.aprocess(text)
+
+        if early_stop_enabled():
+            return self._merge_chunk_outputs(await self._aprocess_ranked(chunks))
+
+        with metrics.timed('llm'):
+            outputs = await self.extractor.abatch(
+                [{"text": chunk} for chunk in chunks],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True,
+            )
+        return self._merge_chunk_outputs(outputs)
+
+    def _process_ranked(self, chunks: List[str]) -> List[Any]:
+        """ Send the most relevant chunks first, stop once the answer is settled
+
+        Returns : outputs (or exceptions) of the chunks that were sent, in chunk order
+        """
+        stop = EarlyStop()
+        order = iter(rank_chunks(chunks))
+        outputs: Dict[int, Any] = {}
+
+        pending: Dict[Future, int] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='llm-chunk') as pool:
+            def submit(count: int):
+                for i in itertools.islice(order, count):
+                    pending[self._submit(pool, chunks[i])] = i
+
+            submit(self.max_concurrency)
+            with metrics.timed('llm'):
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        outputs[pending.pop(future)] = output = future.exception() or future.result()
+                        if not isinstance(output, Exception):
+                            stop.add(output)
+                    # Calls already running are still used, nothing new is sent
+                    if not stop.done:
+                        submit(len(done))
+
+        self._record_skipped(len(chunks), len(outputs))
+        return [outputs[i] for i in sorted(outputs)]
+
+    def _submit(self, pool: ThreadPoolExecutor, chunk: str) -> Future:
+        """ Extraction of one chunk on pool, in a copy of the caller's context
+        so counters set during the call (e.g. cascade escalations) reach the
+        document's metrics (executor threads do not inherit contextvars) """
+        return pool.submit(contextvars.copy_context().run, self.extractor.invoke, {"text": chunk})
+
+    async def _aprocess_ranked(self, chunks: List[str]) -> List[Any]:
+        """ Async version of _process_ranked() """
+        stop = EarlyStop()
+        order = iter(rank_chunks(chunks))
+        outputs: Dict[int, Any] = {}
+        pending: Dict[asyncio.Task, int] = {}
+
+        def submit(count: int):
+            for i in itertools.islice(order, count):
+                pending[asyncio.ensure_future(self.extractor.ainvoke({"text": chunks[i]}))] = i
+
+        submit(self.max_concurrency)
+        with metrics.timed('llm'):
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outputs[pending.pop(task)] = output = task.exception() or task.result()
+                    if not isinstance(output, Exception):
+                        stop.add(output)
+                if not stop.done:
+                    submit(len(done))
+
+        self._record_skipped(len(chunks), len(outputs))
+        return [outputs[i] for i in sorted(outputs)]
+
+    def _record_skipped(self, chunks: int, sent: int):
+        """ Count chunks never sent to the LLM after an early stop """
+        if sent < chunks:
+            metrics.count('chunks_skipped', chunks - sent)
+            metrics.event('early_stop', chunks=chunks, sent=sent)
+
+    def process_stream(self, pages: Iterable[str]) -> DocumentExtraction:
+        """ Chunk and process text as it arrives (e.g. page by page from a loader).
+
+        LLM calls start as soon as the first chunks are complete, while later
+        pages are still being extracted. Chunks are read ahead into a window
+        of 2 x max_concurrency, so a long document is never held in memory
+        whole. With LLM_EARLY_STOP the most relevant chunk of the window is
+        sent first and reading stops once the answer is settled, as in
+        process_chunked() - ranking only sees the window, not the whole
+        document.
+
+        Args: pages - Page texts in document order
+
+        Returns: DocumentExtraction with best results
+        """
+        chunks = self._iter_chunks(pages)
+        first = next(chunks, None)
+        if first is None:
+            raise ValueError("No text to process")
+
+        second = next(chunks, None)
+        if second is None:
+            metrics.count('chunks')
+            return self.process(first)
+
+        window = 2 * self.max_concurrency
+        stop = EarlyStop() if early_stop_enabled() else None
+        numbered = enumerate(itertools.chain((first, second), chunks))
+        # (-relevance, chunk number, chunk): most relevant first, ties in document order
+        ready: List[Tuple[float, int, str]] = []
+        outputs: Dict[int, Any] = {}
+        pending: Dict[Future, int] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='llm-chunk') as pool:
+            while True:
+                settled = stop is not None and stop.done
+                # S1 : Read ahead (extraction of later pages) while calls run
+                while not settled and len(ready) < window:
+                    item = next(numbered, None)
+                    if item is None:
+                        break
+                    n, chunk = item
+                    relevance = chunk_relevance(n, chunk) if stop is not None else 0.0
+                    heapq.heappush(ready, (-relevance, n, chunk))
+
+                # S2 : Keep max_concurrency calls running
+                while ready and not settled and len(pending) < self.max_concurrency:
+                    _, n, chunk = heapq.heappop(ready)
+                    pending[self._submit(pool, chunk)] = n
+                if not pending:
+                    break
+
+                with metrics.timed('llm'):
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outputs[pending.pop(future)] = output = future.exception() or future.result()
+                    if stop is not None and not isinstance(output, Exception):
+                        stop.add(output)
+
+        if stop is not None and stop.done:
+            metrics.event('early_stop', sent=len(outputs), streamed=True)
+        metrics.count('chunks', len(outputs))
+        metrics.event('chunking', chunks=len(outputs), streamed=True)
+        # Failed chunks come back as their exception, merged in chunk order
+        return self._merge_chunk_outputs([outputs[n] for n in sorted(outputs)])
+
+    def _iter_chunks(self, pages: Iterable[str]) -> Iterator[str]:
+        """ Split a stream of texts into LLM-sized chunks
+
+        Texts are joined with newlines, like ExtractionResult.from_pages().
+        Only the tail not yet split is buffered: once it passes twice the chunk
+        size, every chunk but the last is emitted and the last one carried on,
+        so chunk boundaries match splitting the whole text closely.
+        """
+        buffer = ""
+        buffer_length = 0
+        for text in pages:
+            text = text.strip()
+            if not text:
+                continue
+            # Page-sized pieces are merged until they fill chunks
+            buffer = f"{buffer}\n{text}" if buffer else text
+            buffer_length += self.length(text) + 1
+            if buffer_length <= 2 * self.chunk_size:
+                continue
+            with metrics.timed('chunking'):
+                pieces = self.splitter.split_text(buffer)
+            yield from pieces[:-1]
+            buffer = pieces[-1] if pieces else ""
+            buffer_length = self.length(buffer)
+
+        if buffer:
+            with metrics.timed('chunking'):
+                pieces = self.splitter.split_text(buffer)
+            yield from pieces
+
+    def plan_packs(self, texts: List[str], max_documents: int) -> List[List[int]]:
+        """ Group small documents into packed requests, in input order
+
+        A document is packed only if it is under half a chunk; a pack holds
+        at most max_documents and its texts plus the extra answers fit the
+        chunk budget.
+
+        Returns : index lists, one per request (single documents included)
+        """
+        packs: List[List[int]] = []
+        current: List[int] = []
+        used = 0
+        for i, text in enumerate(texts):
+            length = self.length(text)
+            if length > self.chunk_size // 2:
+                packs.append([i])
+                continue
+            extra = self.output_per_document if current else 0
+            if current and (len(current) >= max_documents or used + length + extra > self.chunk_size):
+                packs.append(current)
+                current, used, extra = [], 0, 0
+            current.append(i)
+            used += length + extra
+        if current:
+            packs.append(current)
+        return packs
+
+    def process_packed(self, texts: List[str]) -> List[DocumentExtraction]:
+        """ Process several small documents with one LLM request
+
+        Documents the rule-based fast path handles are left out of the
+        request. The main model answers packed requests (no cascade).
+        Answers are matched to documents by the document_id the model echoes
+        back; a document without exactly one answer carrying its id is
+        processed on its own.
+
+        Args : texts - document texts, each small enough to share a chunk
+        Returns : one DocumentExtraction per text, in order
+        """
+        results: List[Optional[DocumentExtraction]] = [self._try_rules(text) for text in texts]
+        todo = [i for i, result in enumerate(results) if result is None]
+
+        if len(todo) == 1:
+            with metrics.timed('llm'):
+                results[todo[0]] = self.extractor.invoke({"text": texts[todo[0]]})
+        elif todo:
+            documents = "\n\n".join(
+                f'<document id="{n}">\n{texts[i].strip()}\n</document>' for n, i in enumerate(todo, 1)
+            )
+            messages = self.packed_prompt.format_messages(documents=documents, count=len(todo))
+            with metrics.timed('llm'):
+                packed = self.packed_llm.invoke(messages)
+
+            answers = self._answers_by_id(packed.documents if packed is not None else [])
+            unmatched = []
+            for n, i in enumerate(todo, 1):
+                if n in answers:
+                    results[i] = answers[n]
+                else:
+                    unmatched.append(i)
+            metrics.event('packed_request', documents=len(todo), unmatched=len(unmatched))
+
+            for i in unmatched:
+                results[i] = self.process(texts[i])
+
+        return results
+
+    @staticmethod
+    def _answers_by_id(answers: List[PackedExtraction]) -> Dict[int, DocumentExtraction]:
+        """ document_id -> extraction, leaving out ids answered more than once """
+        ids = [answer.document_id for answer in answers]
+        return {
+            answer.document_id: DocumentExtraction(**answer.model_dump(exclude={'document_id'}))
+            for answer in answers
+            if ids.count(answer.document_id) == 1
+        }
+
+    @metrics.timed('chunking')
+    def _split(self, text: str) -> List[str]:
+        """ Split text into LLM-sized chunks """
+        chunks = self.splitter.split_text(text)
+        metrics.count('chunks', max(len(chunks), 1))
+        if len(chunks) > 1:
+            metrics.event('chunking', chunks=len(chunks))
+        return chunks
+
+    def _merge_chunk_outputs(self, outputs: List[Any]) -> DocumentExtraction:
+        """ Drop failed chunks and merge the rest.
+
+        outputs is in chunk order (batch keeps input order), so the merge
+        does not depend on which call finished first.
+        """
         results: List[DocumentExtraction] = []
-        for i, chunk in enumerate(chunks):
-            try:
-                result = self.process(chunk)
-                results.append(result)
-                print(f"    [Chunk {i+1}/{len(chunks)}] expiry={result.expiry_date}, activation={result.activation_date}, conf={result.confidence}")
-            except Exception as e:
-                print(f"    [Chunk {i+1}/{len(chunks)}] Error: {e}")
+        for i, result in enumerate(outputs):
+            if isinstance(result, Exception):
+                metrics.event('chunk_failed', chunk=i + 1, chunks=len(outputs), error=str(result))
                 continue
+            results.append(result)
+            metrics.event(
+                'chunk_processed', chunk=i + 1, chunks=len(outputs),
+                expiry=result.expiry_date, activation=result.activation_date, confidence=result.confidence,
+            )
         
         if not results:
             raise ValueError("All chunks failed to process")
         
         return self._merge_results(results)
 
+    @metrics.timed('merge')
     def _merge_results(self, results: List[DocumentExtraction]) -> DocumentExtraction:
         """ Merge results from ALL chunks - combining extracted fields.
         
@@ -162,8 +598,10 @@ class LLMProcessor:
             for r in results
         )
         
-        print(f"    [Merge] Combined {len(results)} chunks: {len(merged_fields)} fields, "
-              f"expiry={expiry_date}, activation={activation_date}")
+        metrics.event(
+            'merge', chunks=len(results), fields=len(merged_fields),
+            expiry=expiry_date, activation=activation_date,
+        )
         
         return DocumentExtraction(
             document_type=document_type,
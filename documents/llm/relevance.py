@@ -0,0 +1,118 @@
+"""
+Cheap relevance scoring of chunks before they go to the LLM.
+
+The merge only really needs the two dates, the document type and the key
+fields, so chunks with date cues, dates and identifiers are sent first and
+the rest can be skipped once the answer is settled (see EarlyStop).
+"""
+import os
+import re
+from collections import Counter
+from typing import List, Optional, Sequence
+
+from .schema import DocumentExtraction
+
+
+# Cue phrases - also formatted into EXTRACTION_PROMPT, so the scorer and
+# the prompt always look for the same things
+EXPIRY_CUES = ("Valid Through", "Valid Thru", "Expires", "Expiry", "Exp", "Good Through")
+ACTIVATION_CUES = ("Issue Date", "Issued", "Start Date", "Effective Date", "Created")
+
+_MONTHS = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+
+DATE_PATTERNS = [
+    re.compile(r"\b\d{4}[-/.]\d{1,2}[-/.]\d{1,2}\b"),                    # 2027-09-15
+    re.compile(r"\b\d{1,2}[-/.]\d{1,2}[-/.](?:\d{4}|\d{2})\b"),           # 09/15/2027, 15.09.27
+    re.compile(r"\b(?:0?[1-9]|1[0-2])/(?:\d{4}|\d{2})\b"),                # 09/28, 09/2028
+    re.compile(rf"\b{_MONTHS}\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}\b", re.IGNORECASE),  # Sep 15, 2027
+    re.compile(rf"\b\d{{1,2}}(?:st|nd|rd|th)?[\s-]+{_MONTHS}[\s-]+\d{{4}}\b", re.IGNORECASE),  # 15 September 2027, 15-Sep-2027
+]
+
+# Policy / card / licence numbers: letters and digits mixed, or long digit runs
+IDENTIFIER_PATTERN = re.compile(r"\b(?=[A-Z0-9-]*\d)(?=[A-Z0-9-]*[A-Z])[A-Z0-9][A-Z0-9-]{5,}\b|\b\d(?:[\d -]{6,}\d)\b")
+
+CUE_WEIGHT = 3.0
+DATE_WEIGHT = 2.0
+IDENTIFIER_WEIGHT = 1.0
+# Counts per kind are capped so one long table of dates does not dominate
+MAX_HITS = 5
+# The first chunk usually carries the title, which decides document_type
+FIRST_CHUNK_BONUS = 2.0
+
+# Early termination: stop once results at or above this confidence have
+# both dates and agree on the document type
+EARLY_STOP_CONFIDENCE = float(os.getenv('LLM_EARLY_STOP_CONFIDENCE', 0.8))
+EARLY_STOP_VOTES = 2
+
+
+def cue_pattern(cues: Sequence[str]) -> "re.Pattern[str]":
+    """ Case-insensitive whole-word match of any of the cue phrases """
+    return re.compile(r"\b(?:" + "|".join(re.escape(cue) for cue in cues) + r")\b", re.IGNORECASE)
+
+
+_CUES = cue_pattern(EXPIRY_CUES + ACTIVATION_CUES)
+
+
+def early_stop_enabled() -> bool:
+    """ Skip the remaining chunks once the answer is settled (LLM_EARLY_STOP) """
+    return os.getenv('LLM_EARLY_STOP', 'true').lower() == 'true'
+
+
+def score_chunk(text: str) -> float:
+    """ Relevance of a chunk for the extraction (0 = nothing of interest)
+
+    Args : chunk text
+    Returns : weighted count of date cues, dates and identifier-like tokens
+    """
+    cues = len(_CUES.findall(text))
+    dates = sum(len(pattern.findall(text)) for pattern in DATE_PATTERNS)
+    identifiers = len(IDENTIFIER_PATTERN.findall(text))
+    return (
+        CUE_WEIGHT * min(cues, MAX_HITS)
+        + DATE_WEIGHT * min(dates, MAX_HITS)
+        + IDENTIFIER_WEIGHT * min(identifiers, MAX_HITS)
+    )
+
+
+def chunk_relevance(position: int, text: str) -> float:
+    """ score_chunk() plus the title bonus for the first chunk of a document """
+    return score_chunk(text) + (FIRST_CHUNK_BONUS if position == 0 else 0.0)
+
+
+def rank_chunks(chunks: Sequence[str]) -> List[int]:
+    """ Chunk indices, most relevant first (ties keep document order) """
+    scores = [chunk_relevance(i, chunk) for i, chunk in enumerate(chunks)]
+    return sorted(range(len(chunks)), key=lambda i: -scores[i])
+
+
+class EarlyStop:
+    """ Tracks chunk results and tells when the rest can be skipped
+
+    Done when confident results (>= threshold) between them have an expiry
+    and an activation date, and at least EARLY_STOP_VOTES of them agree on a
+    document_type other than 'other' with no confident result disagreeing.
+    """
+
+    def __init__(self, threshold: Optional[float] = None):
+        self.threshold = EARLY_STOP_CONFIDENCE if threshold is None else threshold
+        self.expiry = False
+        self.activation = False
+        self.types: Counter = Counter()
+
+    def add(self, result: DocumentExtraction) -> bool:
+        """ Record one chunk result
+
+        Returns : True once the remaining chunks can be skipped
+        """
+        if result.confidence >= self.threshold:
+            self.expiry = self.expiry or bool(result.expiry_date)
+            self.activation = self.activation or bool(result.activation_date)
+            if result.document_type and result.document_type != 'other':
+                self.types[result.document_type] += 1
+        return self.done
+
+    @property
+    def done(self) -> bool:
+        if not (self.expiry and self.activation) or len(self.types) != 1:
+            return False
+        return next(iter(self.types.values())) >= EARLY_STOP_VOTES
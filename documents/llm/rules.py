@@ -0,0 +1,222 @@
+"""
+Rule-based fast path in front of the LLM.
+
+Templated documents ("Label:   value" lines, a title on top) do not need a
+model call: dates are read from labelled lines and normalised like the
+prompt asks, and the type comes from title/body keywords. extract() always
+returns its best guess with a confidence; the processor only uses it when
+the confidence reaches LLM_RULES_MIN_CONFIDENCE and otherwise calls the LLM.
+"""
+import os
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from dateutil import parser as date_parser
+
+from .relevance import ACTIVATION_CUES, DATE_PATTERNS, EXPIRY_CUES, cue_pattern
+from .schema import DocumentExtraction
+
+
+MIN_CONFIDENCE = float(os.getenv('LLM_RULES_MIN_CONFIDENCE', 0.85))
+
+# Label cues: the prompt's lists plus common label wordings
+EXPIRY_LABELS = cue_pattern(EXPIRY_CUES + ("Valid Until", "Expiration", "Expire"))
+ACTIVATION_LABELS = cue_pattern(ACTIVATION_CUES + ("Valid From", "Activated", "Activation"))
+
+# Keywords per document type (the prompt's classes) - hits in the header
+# lines above the first "Label: value" line count extra
+TYPE_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    'driver_license': ("driver license", "driver's license", "drivers license", "driving licence", "driving license"),
+    'passport': ("passport",),
+    'invoice': ("invoice", "bill to", "amount due"),
+    'insurance_card': ("insurance card", "insurance", "policy number", "group number"),
+    'certificate': ("certificate", "certification", "certified"),
+    'contract': ("agreement", "contract", "lease"),
+    'id_card': ("id card", "identification card", "badge", "employee id"),
+    'credit_card': ("credit card", "debit card", "cardholder"),
+}
+_TYPE_PATTERNS = {doc_type: cue_pattern(words) for doc_type, words in TYPE_KEYWORDS.items()}
+TITLE_LINES = 5
+TITLE_WEIGHT = 3
+
+# Confidence factors
+TITLE_TYPE_CONFIDENCE = 0.95   # type keyword in the title, clear winner
+BODY_TYPE_CONFIDENCE = 0.75    # type from body keywords only
+DATE_FOUND = 1.0               # labelled dates agree, format unambiguous
+DATE_MISSING = 0.85            # no labelled date - may be absent or missed
+DATE_UNSURE = 0.5              # ambiguous day/month or conflicting dates
+
+MAX_FIELDS = 25
+MAX_LABEL_LENGTH = 40
+
+# Box drawing / decoration around labels and values
+_DECORATION = "│║|*•#=+-─━═ \t"
+_LABEL_LINE = re.compile(r"^([^:]{1,%d}):\s*(.+)$" % MAX_LABEL_LENGTH)
+
+
+def rules_enabled() -> bool:
+    """ Try the rules before calling the LLM (LLM_RULES) """
+    return os.getenv('LLM_RULES', 'true').lower() == 'true'
+
+
+def parse_date(value: str) -> Optional[Tuple[str, bool]]:
+    """ First date in a value, normalised to ISO
+
+    "MM/YY" and "MM/YYYY" become the first of the month, numeric dates are
+    month first unless the numbers say otherwise (as in the prompt).
+
+    Returns : (YYYY-MM-DD, ambiguous) or None - ambiguous when day and month
+              could be swapped (e.g. 01/11/2024)
+    """
+    matches = [m for pattern in DATE_PATTERNS for m in pattern.finditer(value)]
+    if not matches:
+        return None
+    # Earliest match, longest at the same position ("09/15/2027" over "09/15")
+    match = min(matches, key=lambda m: (m.start(), -len(m.group())))
+    found = match.group()
+
+    try:
+        if any(c.isalpha() for c in found):
+            # Month names - no day/month ambiguity
+            return date_parser.parse(found).date().isoformat(), False
+
+        numbers = [int(part) for part in re.split(r"[-/.]", found)]
+        if len(numbers) == 2:
+            month, year = numbers
+            return date(_full_year(year), month, 1).isoformat(), False
+
+        if numbers[0] > 31:
+            year, month, day = numbers
+            return date(year, month, day).isoformat(), False
+
+        first, second, year = numbers
+        if first > 12:
+            return date(_full_year(year), second, first).isoformat(), False
+        ambiguous = second <= 12 and first != second
+        return date(_full_year(year), first, second).isoformat(), ambiguous
+    except (ValueError, OverflowError):
+        return None
+
+
+def _full_year(year: int) -> int:
+    return year + 2000 if year < 100 else year
+
+
+def _labelled_lines(text: str) -> List[Tuple[str, str]]:
+    """ (label, value) for every "Label: value" line """
+    pairs = []
+    for line in text.splitlines():
+        match = _LABEL_LINE.match(line.strip(_DECORATION))
+        if not match:
+            continue
+        label = match.group(1).strip(_DECORATION)
+        value = match.group(2).strip(_DECORATION)
+        if label and value and any(c.isalpha() for c in label):
+            pairs.append((label, value))
+    return pairs
+
+
+def _resolve(candidates: List[Tuple[str, bool]]) -> Tuple[Optional[str], float]:
+    """ One date from all labelled candidates for a role
+
+    Returns : (date or None, confidence factor)
+    """
+    if not candidates:
+        return None, DATE_MISSING
+    certain = {value for value, ambiguous in candidates if not ambiguous}
+    if len(certain) == 1:
+        return certain.pop(), DATE_FOUND
+    # Only ambiguous formats, or labelled dates that disagree
+    return candidates[0][0], DATE_UNSURE
+
+
+def _header(text: str) -> List[str]:
+    """ Lines with words in them above the first "Label: value" line
+    (at most TITLE_LINES), without decoration """
+    header = []
+    for line in text.splitlines():
+        line = line.strip(_DECORATION)
+        if _LABEL_LINE.match(line) and header:
+            break
+        if sum(c.isalpha() for c in line) >= 3 and not _LABEL_LINE.match(line):
+            header.append(line)
+            if len(header) == TITLE_LINES:
+                break
+    return header
+
+
+def classify(text: str) -> Tuple[str, float]:
+    """ Keyword document type
+
+    Returns : (document_type, confidence) - ('other', 0.0) when undecided
+    """
+    title = "\n".join(_header(text))
+
+    scores = {}
+    in_title = {}
+    for doc_type, pattern in _TYPE_PATTERNS.items():
+        title_hits = len(pattern.findall(title))
+        # The title is part of the text too, so it counts TITLE_WEIGHT + 1 times
+        score = TITLE_WEIGHT * title_hits + len(pattern.findall(text))
+        if score:
+            scores[doc_type] = score
+            in_title[doc_type] = title_hits > 0
+
+    if not scores:
+        return 'other', 0.0
+    ranked = sorted(scores.items(), key=lambda item: -item[1])
+    if len(ranked) > 1 and ranked[0][1] == ranked[1][1]:
+        return 'other', 0.0
+    doc_type = ranked[0][0]
+    return doc_type, TITLE_TYPE_CONFIDENCE if in_title[doc_type] else BODY_TYPE_CONFIDENCE
+
+
+def _field_key(label: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", label.lower()).strip("_")
+
+
+def extract(text: str) -> DocumentExtraction:
+    """ Rule-based extraction of a templated document
+
+    Args : document text
+    Returns : DocumentExtraction whose confidence is the product of the
+              type and date confidences
+    """
+    expiry_candidates = []
+    activation_candidates = []
+    fields = {}
+
+    for label, value in _labelled_lines(text):
+        is_expiry = bool(EXPIRY_LABELS.search(label))
+        is_activation = bool(ACTIVATION_LABELS.search(label))
+        if is_expiry != is_activation:
+            parsed = parse_date(value)
+            if parsed is not None:
+                (expiry_candidates if is_expiry else activation_candidates).append(parsed)
+                # Dates have their own fields, as the prompt asks
+                continue
+        key = _field_key(label)
+        if key and key not in fields and len(fields) < MAX_FIELDS:
+            fields[key] = value
+
+    expiry_date, expiry_confidence = _resolve(expiry_candidates)
+    activation_date, activation_confidence = _resolve(activation_candidates)
+    document_type, type_confidence = classify(text)
+
+    header = _header(text)
+    title = header[0] if header else ""
+    summary = title.title() if title.isupper() else title
+    if expiry_date:
+        summary = f"{summary}, valid until {expiry_date}."
+    elif summary:
+        summary = f"{summary}."
+
+    return DocumentExtraction(
+        document_type=document_type,
+        extracted_fields=fields,
+        expiry_date=expiry_date,
+        activation_date=activation_date,
+        summary=summary,
+        confidence=round(type_confidence * expiry_confidence * activation_confidence, 3),
+    )
@@ -1,5 +1,12 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+
+# Classes the extraction prompt asks the model to choose from
+DOCUMENT_TYPES = (
+    'driver_license', 'passport', 'invoice', 'insurance_card', 'certificate',
+    'contract', 'id_card', 'credit_card', 'other',
+)
 
 class DocumentExtraction(BaseModel):
     """ Schema for LLM extraction input """
@@ -30,3 +37,18 @@ class DocumentExtraction(BaseModel):
     description="Confidence score from 0.0 to 1.0"
     )
 
+
+class PackedExtraction(DocumentExtraction):
+    """ One answer of a packed request, tagged with the document it is for """
+
+    document_id: int = Field(
+        description = "The id of the <document id=\"N\"> tag this extraction is for"
+    )
+
+
+class DocumentExtractionList(BaseModel):
+    """ Schema for a packed request - one extraction per document """
+
+    documents: List[PackedExtraction] = Field(
+        description = "One extraction per document, each with the id of its document"
+    )
@@ -0,0 +1,67 @@
+"""
+Token estimates for sizing LLM chunks.
+
+No tokenizer ships with the local models we call, so token counts are
+estimated from characters per script. The ratios are deliberately on the
+low side (more tokens than a real tokenizer would count) so a chunk sized
+to the budget still fits the context window.
+"""
+import json
+import math
+import os
+import re
+
+from .schema import DocumentExtraction
+
+
+# Characters per token, per script
+LATIN_CHARS_PER_TOKEN = 4.0       # English text, digits, punctuation
+DEVANAGARI_CHARS_PER_TOKEN = 2.0  # Hindi OCR text (vowel signs split words up)
+OTHER_CHARS_PER_TOKEN = 2.0       # Any other non-Latin script, symbols, box drawing
+
+# Tokens kept free for the structured answer
+OUTPUT_RESERVE_TOKENS = 1024
+# Extra answer room per additional document in a packed request
+OUTPUT_TOKENS_PER_DOCUMENT = 400
+# Upper bound per chunk even with very large context windows - small models
+# miss details in the middle of very long inputs
+MAX_CHUNK_TOKENS = int(os.getenv('LLM_MAX_CHUNK_TOKENS', 8000))
+# Smallest chunk worth sending, whatever the configuration says
+MIN_CHUNK_TOKENS = 256
+CHUNK_OVERLAP_TOKENS = int(os.getenv('LLM_CHUNK_OVERLAP_TOKENS', 50))
+
+_DEVANAGARI = re.compile(r"[\u0900-\u097F\uA8E0-\uA8FF]")
+_NON_LATIN = re.compile(r"[^\x00-\u024F]")
+
+
+def estimate_tokens(text: str) -> int:
+    """ Approximate token count of text (script-aware) """
+    if text.isascii():
+        return math.ceil(len(text) / LATIN_CHARS_PER_TOKEN)
+
+    non_latin = len(_NON_LATIN.findall(text))
+    devanagari = len(_DEVANAGARI.findall(text))
+    latin = len(text) - non_latin
+    return math.ceil(
+        latin / LATIN_CHARS_PER_TOKEN
+        + devanagari / DEVANAGARI_CHARS_PER_TOKEN
+        + (non_latin - devanagari) / OTHER_CHARS_PER_TOKEN
+    )
+
+
+def prompt_overhead_tokens(prompt: str) -> int:
+    """ Tokens used by everything but the document: the prompt template
+    and the output schema sent with structured output """
+    schema = json.dumps(DocumentExtraction.model_json_schema())
+    return estimate_tokens(prompt.replace("{text}", "")) + estimate_tokens(schema)
+
+
+def chunk_budget(context_tokens: int, prompt: str) -> int:
+    """ Document tokens that fit in one call
+
+    Args : context_tokens - model context window
+           prompt - prompt template (with a {text} placeholder)
+    Returns : tokens per chunk, between MIN_CHUNK_TOKENS and MAX_CHUNK_TOKENS
+    """
+    available = context_tokens - prompt_overhead_tokens(prompt) - OUTPUT_RESERVE_TOKENS
+    return max(MIN_CHUNK_TOKENS, min(MAX_CHUNK_TOKENS, available))
@@ -1,4 +1,4 @@
-from .base import BaseLoader, ExtractionResult
+from .base import BaseLoader, ExtractionResult, Page
 from .pdf_loader import PDFLoader
 from .image_loader import ImageLoader
 from .text_loader import TextLoader
@@ -1,21 +1,57 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
+from documents.metrics import StageTimings
 
 
 
+@dataclass
+class Page:
+    "Text of one page / frame / segment of a document"
+    text: str
+    confidence: float
+    error: Optional[str] = None
+
+
 @dataclass
 class ExtractionResult:
     "Holds result of extraction"
     text: str
     confidence: float
     error: Optional[str] = None
+    timings: Optional[StageTimings] = None
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Page], empty_error: str) -> "ExtractionResult":
+        """ Join pages in order - confidence is the page average (failed
+        pages count as 0)
+
+        Args : pages - page results
+               empty_error - error when no page has text
+        """
+        texts = []
+        errors = []
+        scores = []
+        for page in pages:
+            scores.append(page.confidence)
+            if page.error:
+                errors.append(page.error)
+            if page.text.strip():
+                texts.append(page.text.strip())
+
+        if not texts:
+            return cls(text="", confidence=0.0, error="; ".join(errors) or empty_error)
+
+        return cls(text="\n".join(texts), confidence=sum(scores) / len(scores))
 
 
 class BaseLoader(ABC):
     "Abstarct base class for document loaders"
 
+    # Error reported when a document yields no text at all
+    EMPTY_ERROR = "No text extracted"
+
     @abstractmethod
     def extract(self, file_path:str) -> ExtractionResult:
         """Extract text from document
@@ -28,6 +64,56 @@ class BaseLoader(ABC):
         """
         pass
 
+    def extract_bytes(self, data: bytes, filename: str) -> ExtractionResult:
+        """Extract text from in-memory file content
+
+        Loaders override this to read straight from memory. The default
+        writes the content to a temp file and calls extract().
+
+        Args:
+        data : File content
+        filename : Original file name (used for its extension)
+
+        Returns : Extraction Result with Extracted text and confidence score
+        """
+        import os
+        import tempfile
+
+        suffix = os.path.splitext(filename)[1]
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+            f.write(data)
+            temp_path = f.name
+        try:
+            return self.extract(temp_path)
+        finally:
+            os.remove(temp_path)
+
+    def iter_pages(self, file_path: str) -> Iterator[Page]:
+        """Extract the document page by page, as pages become available
+
+        Multi-page loaders override this so the LLM stage can start on the
+        first pages while later ones are still being extracted. The default
+        is a single page with the whole extract() result.
+
+        Args: file_path
+
+        Returns : Iterator of Page in document order
+        """
+        result = self.extract(file_path)
+        yield Page(text=result.text, confidence=result.confidence, error=result.error)
+
+    def iter_pages_bytes(self, data: bytes, filename: str) -> Iterator[Page]:
+        """In-memory version of iter_pages()
+
+        Args:
+        data : File content
+        filename : Original file name (used for its extension)
+
+        Returns : Iterator of Page in document order
+        """
+        result = self.extract_bytes(data, filename)
+        yield Page(text=result.text, confidence=result.confidence, error=result.error)
+
     @abstractmethod
     def supports(self, file_path: str) -> bool:
         """ Checks if this loader supports given file 
@@ -1,8 +1,82 @@
 import fitz
-import pytesseract
-from PIL import Image, ImageEnhance, ImageFilter
-import io
-from .base import BaseLoader, ExtractionResult
+import numpy as np
+from PIL import Image
+import os
+from typing import Dict, Iterator, List, Tuple, Union
+from documents import metrics
+from documents.extractors import ocr, ocr_pool, preprocess
+from .base import BaseLoader, ExtractionResult, Page
+
+
+# File path or in-memory PDF content
+PDFSource = Union[str, bytes]
+
+
+def _open(source: PDFSource):
+    """ Open a fitz document from a path or from bytes """
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype='pdf')
+    return fitz.open(source)
+
+
+def _render_gray(page, dpi: int):
+    """ Render a page straight to an 8-bit grayscale pixmap """
+    mat = fitz.Matrix(dpi/72, dpi/72)
+    return page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)
+
+
+def _pixmap_array(pix) -> np.ndarray:
+    """ (height, width) uint8 view on the pixmap's sample buffer - no copy """
+    rows = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+    return rows[:, :pix.width]
+
+
+def _page_task_args(doc, source: PDFSource, pages: List[Tuple[int, int]], lang: str) -> Iterator[Tuple[PDFSource, int, int, str]]:
+    """ (source, page_num, dpi, lang) for _ocr_page_task, one page at a time
+
+    A file path is opened by the worker itself. In-memory content is cut
+    down to a one-page PDF first, so a large upload is not pickled to a
+    worker (and re-parsed there) once per page.
+    """
+    for page_num, dpi in pages:
+        if isinstance(source, bytes):
+            single = fitz.open()
+            single.insert_pdf(doc, from_page=page_num, to_page=page_num)
+            yield single.tobytes(), 0, dpi, lang
+            single.close()
+        else:
+            yield source, page_num, dpi, lang
+
+
+def _ocr_page_task(source: PDFSource, page_num: int, dpi: int = 300, lang: str = ocr.MULTI_LANG) -> Tuple[str, float]:
+    """ Render and OCR one page (runs in an OCR pool worker)
+
+    Module-level so it can be pickled; each worker opens its own document
+    because fitz documents cannot cross process boundaries.
+
+    Returns : (text, OCR confidence 0-1)
+    """
+    doc = _open(source)
+    try:
+        # Render page at the DPI picked for its size (see PDFLoader._page_dpi),
+        # directly in grayscale - no RGB raster, no PNG encode/decode
+        pix = _render_gray(doc[page_num], dpi)
+    finally:
+        doc.close()
+
+    # Preprocess for better OCR, starting from the pixmap buffer itself
+    gray = preprocess.prepare_gray(_pixmap_array(pix), crop=True)
+    img = preprocess.enhance(gray)
+    # Non-enhanced copy for re-OCR of low-confidence lines (a copy, so it
+    # does not pin the pixmap buffer)
+    alternative = Image.fromarray(gray.copy())
+    del gray
+
+    # Upright the page, pick its language packs (the document's, see
+    # PDFLoader._document_lang), OCR with word confidences
+    result = ocr.recognise(img, alternative=alternative, default_lang=lang)
+    return result.text, result.confidence
+
 
 class PDFLoader(BaseLoader):
     """
@@ -14,100 +88,87 @@ class PDFLoader(BaseLoader):
         """ Check if file is a PDF or not """
         return file_path.lower().endswith('.pdf')
 
-    def _extract_text_direct(self, doc) -> str:
-        """Extract text directly from PDF"""
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        return text.strip()
-
-    def _preprocess_image(self, img: Image.Image) -> Image.Image:
-        """Preprocess image for better OCR results"""
-        # Auto-crop to content (remove white margins)
-        # Convert to grayscale first for getbbox
-        gray_for_crop = img.convert('L')
-        
-        # Find content by looking for non-near-white pixels
-        # Invert and use point to create mask of dark pixels
-        threshold = 250
-        mask = gray_for_crop.point(lambda x: 255 if x < threshold else 0)
-        bbox = mask.getbbox()
-        
-        if bbox:
-            # Add small padding
-            padding = 20
-            left = max(0, bbox[0] - padding)
-            top = max(0, bbox[1] - padding)
-            right = min(img.width, bbox[2] + padding)
-            bottom = min(img.height, bbox[3] + padding)
-            img = img.crop((left, top, right, bottom))
-        
-        # Convert to grayscale
-        img = img.convert('L')
-        
-        # Enhance contrast
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(2.0)
-        
-        # Enhance sharpness
-        enhancer = ImageEnhance.Sharpness(img)
-        img = enhancer.enhance(1.5)
-        
-        return img
-
-    def _extract_text_ocr(self, doc) -> str:
-        """Extract text using OCR for scanned PDFs"""
-        text = ""
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            # Render page to image at 300 DPI for better OCR
-            mat = fitz.Matrix(300/72, 300/72)
-            pix = page.get_pixmap(matrix=mat)
-            
-            # Convert to PIL Image
-            img = Image.open(io.BytesIO(pix.tobytes("png")))
-            
-            # Preprocess for better OCR
-            img = self._preprocess_image(img)
-            
-            # Save debug image (optional - comment out in production)
-            # img.save(f"debug_page_{page_num}.png")
-            
-            # Run OCR with English + Hindi support and custom config
-            custom_config = r'--oem 3 --psm 6'
-            page_text = pytesseract.image_to_string(img, lang='eng+hin', config=custom_config)
-            text += page_text + "\n"
-        
-        return text.strip()
+    # A page whose text layer has fewer characters than this is OCR'd
+    MIN_PAGE_CHARS = int(os.getenv('PDF_MIN_PAGE_CHARS', 20))
+
+    # Render so the longer page side is about this many pixels
+    # (A4 at 300 DPI), clamped to a sane DPI range
+    TARGET_LONG_SIDE_PX = 3500
+    MIN_DPI = 150
+    MAX_DPI = 400
+
+    # Blank check: low-res gray render, blank if almost no dark pixels
+    BLANK_CHECK_DPI = 24
+    BLANK_DARK_LEVEL = 200
+    BLANK_MAX_DARK_RATIO = 0.002
+
+    EMPTY_ERROR = "No text extracted even with OCR"
+
+    @metrics.timed('pdf_text')
+    def _extract_text_direct(self, doc, page_nums: range) -> List[str]:
+        """Extract the text layer of the given pages"""
+        return [doc[page_num].get_text().strip() for page_num in page_nums]
+
+    def _is_blank(self, page) -> bool:
+        """ Cheap blank page check from a low resolution gray histogram """
+        pix = _render_gray(page, self.BLANK_CHECK_DPI)
+        dark = np.count_nonzero(_pixmap_array(pix) < self.BLANK_DARK_LEVEL)
+        return dark <= self.BLANK_MAX_DARK_RATIO * pix.width * pix.height
+
+    def _page_dpi(self, page) -> int:
+        """ Render DPI for a page - small pages (cards, receipts) get more,
+        oversized pages less, so OCR input stays about the same size """
+        long_side_inches = max(page.rect.width, page.rect.height) / 72
+        if long_side_inches <= 0:
+            return self.MAX_DPI
+        dpi = int(self.TARGET_LONG_SIDE_PX / long_side_inches)
+        return max(self.MIN_DPI, min(self.MAX_DPI, dpi))
+
+    @metrics.timed('pdf_ocr')
+    def _document_lang(self, doc, page_num: int) -> str:
+        """ Language packs for every OCR'd page, from one script detection
+        on a small gray render of the first page to OCR (English + Hindi
+        when unsure) """
+        page = doc[page_num]
+        long_side_inches = max(page.rect.width, page.rect.height) / 72
+        dpi = self.MAX_DPI if long_side_inches <= 0 else min(self.MAX_DPI, int(ocr.OSD_MAX_SIDE / long_side_inches))
+        pix = _render_gray(page, dpi)
+        return ocr.document_lang(Image.fromarray(_pixmap_array(pix)), default_lang=ocr.MULTI_LANG)
+
+    @metrics.timed('pdf_ocr')
+    def _extract_text_ocr(self, doc, source: PDFSource, pages: List[Tuple[int, int]], lang: str) -> Dict[int, Union[Tuple[str, float], Exception]]:
+        """Extract text using OCR for the given (page_num, dpi) pages
+
+        Pages are rendered and OCR'd in parallel on the shared OCR pool
+        (OCR_WORKERS), with the document's language packs. A page that
+        fails maps to its exception.
+
+        Returns : dict page_num -> (text, confidence) or exception
+        """
+        metrics.count('pages_ocr', len(pages))
+        results = ocr_pool.map_ordered(_ocr_page_task, _page_task_args(doc, source, pages, lang))
+        return {page_num: result for (page_num, _), result in zip(pages, results)}
 
     def extract(self, file_path: str) -> ExtractionResult:
         """ Extract Text from PDF - uses OCR if needed """
-        try:
-            doc = fitz.open(file_path)
-            
-            # First try direct text extraction
-            text = self._extract_text_direct(doc)
-            
-            # If no text found, try OCR
-            if not text:
-                text = self._extract_text_ocr(doc)
-                confidence = 0.85  # OCR is slightly less reliable
-            else:
-                confidence = 1.0
-            
-            doc.close()
+        return self._extract_from(file_path)
 
-            if not text:
-                return ExtractionResult(
-                    text="",
-                    confidence=0.0,
-                    error="No text extracted even with OCR"
-                )
+    def extract_bytes(self, data: bytes, filename: str) -> ExtractionResult:
+        """ Extract Text from in-memory PDF content """
+        return self._extract_from(data)
 
-            return ExtractionResult(
-                text=text,
-                confidence=confidence
-            )
+    def iter_pages(self, file_path: str) -> Iterator[Page]:
+        """ Pages in order, as they are read / OCR'd """
+        return self._iter_pages(file_path)
+
+    def iter_pages_bytes(self, data: bytes, filename: str) -> Iterator[Page]:
+        """ Pages of in-memory PDF content, as they are read / OCR'd """
+        return self._iter_pages(data)
+
+    def _extract_from(self, source: PDFSource) -> ExtractionResult:
+        """ source is the file path or the PDF bytes """
+        try:
+            return ExtractionResult.from_pages(self._iter_pages(source), self.EMPTY_ERROR)
 
         except Exception as e:
             return ExtractionResult(
@@ -115,4 +176,50 @@ class PDFLoader(BaseLoader):
                 confidence=0.0,
                 error=str(e)
             )
-        
\ No newline at end of file
+
+    def _iter_pages(self, source: PDFSource) -> Iterator[Page]:
+        """ Decides per page: text layer if it has enough text, otherwise OCR
+        (skipping blank pages).
+
+        Works through the document a window of pages at a time, so a long
+        document is never held in memory at once and the first pages are
+        available before the last ones are OCR'd. Confidence is 1.0 for text
+        layer pages, Tesseract word confidence for OCR'd pages and 0 for
+        pages that failed.
+        """
+        doc = _open(source)
+        try:
+            lang = None
+            window = max(8, 2 * ocr_pool.get_workers())
+            for start in range(0, len(doc), window):
+                page_nums = range(start, min(start + window, len(doc)))
+                page_texts = self._extract_text_direct(doc, page_nums)
+
+                ocr_pages = []
+                for page_num, page_text in zip(page_nums, page_texts):
+                    if len(page_text) >= self.MIN_PAGE_CHARS:
+                        metrics.count('pages_text')
+                        continue
+                    page = doc[page_num]
+                    if self._is_blank(page):
+                        metrics.count('pages_blank')
+                        continue
+                    ocr_pages.append((page_num, self._page_dpi(page)))
+
+                ocr_results = {}
+                if ocr_pages:
+                    if lang is None:
+                        lang = self._document_lang(doc, ocr_pages[0][0])
+                    ocr_results = self._extract_text_ocr(doc, source, ocr_pages, lang)
+
+                for page_num, page_text in zip(page_nums, page_texts):
+                    result = ocr_results.get(page_num)
+                    if isinstance(result, Exception):
+                        yield Page(text="", confidence=0.0, error=f"page {page_num + 1}: {result}")
+                    elif result is not None:
+                        ocr_text, ocr_confidence = result
+                        yield Page(text=ocr_text.strip(), confidence=ocr_confidence)
+                    elif page_text:
+                        yield Page(text=page_text, confidence=1.0)
+        finally:
+            doc.close()
@@ -1,3 +1,5 @@
+import io
+
 from documents.loaders import BaseLoader, ExtractionResult
 
 class TextLoader(BaseLoader):
@@ -16,18 +18,23 @@ class TextLoader(BaseLoader):
             with open(file_path, 'r', encoding='utf-8') as f:
                 text = f.read()
 
-            if not text.strip():
-                return ExtractionResult(
-                    text="",
-                    confidence=0.0,
-                    error="File is empty"
-                )
+            return self._result(text)
 
+        except Exception as e:
             return ExtractionResult(
-                text=text,
-                confidence=1.0
+                text="",
+                confidence=0.0,
+                error=str(e)
             )
 
+    def extract_bytes(self, data: bytes, filename: str) -> ExtractionResult:
+        """ Extracts data from in-memory text file content """
+
+        try:
+            # Same newline handling as reading the file in text mode
+            text = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8').read()
+            return self._result(text)
+
         except Exception as e:
             return ExtractionResult(
                 text="",
@@ -35,4 +42,18 @@ class TextLoader(BaseLoader):
                 error=str(e)
             )
 
+    def _result(self, text: str) -> ExtractionResult:
+        """ Wrap text read from file or memory """
+        if not text.strip():
+            return ExtractionResult(
+                text="",
+                confidence=0.0,
+                error="File is empty"
+            )
+
+        return ExtractionResult(
+            text=text,
+            confidence=1.0
+        )
+
             
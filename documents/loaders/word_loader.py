@@ -1,3 +1,5 @@
+import io
+
 from docx import Document
 from .base import BaseLoader, ExtractionResult
 
@@ -11,8 +13,15 @@ class WordLoader(BaseLoader):
         return any(file_path.lower().endswith(ext) for ext in self.SUPPORTED_EXTENSIONS)
 
     def extract(self, file_path: str) -> ExtractionResult:
+        return self._extract_from(file_path)
+
+    def extract_bytes(self, data: bytes, filename: str) -> ExtractionResult:
+        return self._extract_from(io.BytesIO(data))
+
+    def _extract_from(self, source) -> ExtractionResult:
+        """ source is a path or a file-like object """
         try:
-            doc = Document(file_path)
+            doc = Document(source)
             text = "\n".join([para.text for para in doc.paragraphs])
             
             if not text.strip():
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from dataclasses import asdict
+
+from django.core.management.base import BaseCommand
+
+from documents.apps import start_warm_up
+from documents.jobs import get_job_store
+from documents.pipeline import get_pipeline
+
+
+# Longest wait between heartbeats / checks for stale documents (seconds)
+REQUEUE_INTERVAL = 60.0
+
+class Command(BaseCommand):
+    help = "Process queued document jobs (see POST /api/jobs/)"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (job_id, index) per worker thread, while it processes a document
+        self._active = {}
+        self._active_lock = threading.Lock()
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=int(os.getenv('JOB_WORKER_CONCURRENCY', 4)),
+            help="Documents processed at the same time (default: JOB_WORKER_CONCURRENCY or 4)",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help="Seconds to wait when the queue is empty",
+        )
+        parser.add_argument(
+            '--stale-after', type=float, default=600.0,
+            help="Requeue documents whose worker has not reported for this many seconds",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit when the queue is empty instead of polling",
+        )
+
+    def handle(self, *args, **options):
+        store = get_job_store()
+        pipeline = get_pipeline()
+        # Model loads while the queue is checked, not on the first document
+        start_warm_up()
+
+        self._requeue_stale(store, options['stale_after'])
+
+        self.stdout.write(f"Processing jobs with concurrency={options['concurrency']}")
+
+        stop = threading.Event()
+        workers = [
+            threading.Thread(
+                target=self._work,
+                args=(store, pipeline, options, stop),
+                name=f"job-worker-{i}",
+                daemon=True,
+            )
+            for i in range(options['concurrency'])
+        ]
+        for worker in workers:
+            worker.start()
+
+        # Claims of documents still being processed are refreshed well within
+        # --stale-after, so only documents of a worker that died mid-run are
+        # picked up again (without waiting for a restart)
+        requeue_interval = min(REQUEUE_INTERVAL, options['stale_after'] / 3)
+        next_requeue = time.monotonic() + requeue_interval
+        try:
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(min(0.5, requeue_interval))
+                if time.monotonic() >= next_requeue:
+                    self._tick(store, options['stale_after'])
+                    next_requeue = time.monotonic() + requeue_interval
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping after current documents...")
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+    def _work(self, store, pipeline, options, stop):
+        """ Claim and process documents until stopped (or queue empty with --once) """
+        while not stop.is_set():
+            try:
+                item = store.claim()
+            except Exception as e:
+                self.stderr.write(f"Claiming a document failed: {type(e).__name__}: {e}")
+                time.sleep(options['poll_interval'])
+                continue
+            if item is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            self._set_active((item['job_id'], item['index']))
+            try:
+                result = self._process(pipeline, item)
+                store.complete(item['job_id'], item['index'], asdict(result))
+            except Exception as e:
+                # e.g. "database is locked" from the cache or job store - one
+                # document must not take the worker thread down with it
+                self.stderr.write(f"[{item['job_id']}] {item['filename']}: {type(e).__name__}: {e}")
+                self._fail(store, pipeline, item, e)
+                continue
+            finally:
+                self._set_active(None)
+            self.stdout.write(f"[{item['job_id']}] {item['filename']}: {result.error or 'ok'}")
+
+    def _fail(self, store, pipeline, item, error):
+        """ Store an error result for a document that could not be processed
+
+        If even that fails the document stays 'processing' until
+        requeue_stale() puts it back in the queue.
+        """
+        result = pipeline._error_result(item['filename'], f"Processing failed: {error}")
+        try:
+            store.complete(item['job_id'], item['index'], asdict(result))
+        except Exception as e:
+            self.stderr.write(f"[{item['job_id']}] {item['filename']}: could not store error result: {e}")
+
+    def _set_active(self, claim):
+        """ Record the document this worker thread is processing (None when done) """
+        with self._active_lock:
+            if claim is None:
+                self._active.pop(threading.get_ident(), None)
+            else:
+                self._active[threading.get_ident()] = claim
+
+    def _tick(self, store, stale_after):
+        """ Heartbeat for the documents in progress, then requeue stale ones """
+        with self._active_lock:
+            claims = list(self._active.values())
+        try:
+            store.heartbeat(claims)
+        except Exception as e:
+            self.stderr.write(f"Heartbeat failed: {e}")
+        self._requeue_stale(store, stale_after)
+
+    def _requeue_stale(self, store, stale_after):
+        """ Put documents stuck in 'processing' back in the queue """
+        try:
+            requeued = store.requeue_stale(stale_after)
+        except Exception as e:
+            self.stderr.write(f"Requeue of stale documents failed: {e}")
+            return
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale document(s)")
+
+    def _process(self, pipeline, item):
+        """ Run one queued document through the pipeline, straight from memory """
+        return pipeline.process_single(item['filename'], item['content'])
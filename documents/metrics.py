@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+logger = logging.getLogger('documents.events')
+
+# Chunk calls of one document run on several threads and update the same
+# StageTimings (module level, so StageTimings stays picklable)
+_update_lock = threading.Lock()
+
+
+@dataclass
+class StageTimings:
+    """ Per-document stage durations (seconds) and counters """
+    durations: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, stage: str, seconds: float):
+        with _update_lock:
+            self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    def incr(self, name: str, n: int = 1):
+        with _update_lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def merge(self, other: Optional["StageTimings"]):
+        if other is None:
+            return
+        for stage, seconds in other.durations.items():
+            self.add(stage, seconds)
+        for name, n in other.counts.items():
+            self.incr(name, n)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stages": {stage: round(seconds, 4) for stage, seconds in self.durations.items()},
+            "counts": dict(self.counts),
+        }
+
+
+_current: ContextVar[Optional[StageTimings]] = ContextVar('stage_timings', default=None)
+
+
+@contextmanager
+def collect(timings: Optional[StageTimings] = None) -> Iterator[StageTimings]:
+    """ Collect timed() stages and count() calls made inside the block
+
+    Collection follows the current thread / asyncio task (contextvars), so
+    concurrent documents do not mix their timings.
+    """
+    timings = timings if timings is not None else StageTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(stage: str):
+    """ Time a block (or, as a decorator, a sync function) as a pipeline stage """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _current.get()
+        if timings is not None:
+            timings.add(stage, time.perf_counter() - start)
+
+
+def count(name: str, n: int = 1):
+    """ Add to a per-document counter (e.g. pages_ocr, chunks) """
+    timings = _current.get()
+    if timings is not None:
+        timings.incr(name, n)
+
+
+def event(name: str, **fields):
+    """ Emit a structured log event on the 'documents.events' logger """
+    message = " ".join([name] + [f"{key}={value}" for key, value in fields.items()])
+    logger.info(message, extra={"event": name, "fields": fields})
+
+
+class Summary:
+    """ Count/sum plus quantiles over the most recent samples """
+
+    def __init__(self, max_samples: int = 2048):
+        self.count = 0
+        self.sum = 0.0
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape_label(value: Any) -> str:
+    """ Escape backslashes, double quotes and newlines in a label value
+    (Prometheus text format) """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    """ Sample value at full precision - counters and sums must not round
+    (1234567 documents is not 1.23457e+06) """
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class MetricsRegistry:
+    """ In-process metrics rendered in Prometheus text format """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+    PREFIX = 'doc_pipeline_'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries: Dict[str, Dict[Labels, Summary]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    def observe(self, name: str, value: float, help: str = "", **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help)
+            self._summaries.setdefault(name, {}).setdefault(key, Summary()).observe(value)
+
+    def inc(self, name: str, n: float = 1, help: str = "", **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help)
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + n
+
+    def record_document(self, timings: StageTimings, source_type: str, error: Optional[str]):
+        """ Aggregate one processed document """
+        for stage, seconds in timings.durations.items():
+            self.observe('stage_seconds', seconds, "Time spent per pipeline stage", stage=stage)
+        self.observe('pages_ocr', timings.counts.get('pages_ocr', 0), "Pages OCR'd per document")
+        self.observe('chunks', timings.counts.get('chunks', 0), "LLM chunks per document")
+        for outcome in ('hit', 'miss'):
+            if timings.counts.get(f'rules_{outcome}'):
+                self.inc('rules_total', timings.counts[f'rules_{outcome}'], "Rule-based fast path attempts", outcome=outcome)
+        self.inc(
+            'documents_total', 1, "Processed documents",
+            source_type=source_type, status='error' if error else 'ok',
+        )
+
+    def summary(self, name: str, **labels) -> Optional[Summary]:
+        with self._lock:
+            return self._summaries.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def reset(self):
+        with self._lock:
+            self._summaries.clear()
+            self._counters.clear()
+
+    @staticmethod
+    def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + "}"
+
+    def render(self, extra_gauges: Optional[Dict[str, float]] = None) -> str:
+        """ Prometheus text exposition of all metrics
+
+        Args : extra_gauges - point-in-time values to append (e.g. cache stats)
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._summaries.items()):
+                full = self.PREFIX + name
+                lines.append(f"# HELP {full} {self._help.get(name, '')}")
+                lines.append(f"# TYPE {full} summary")
+                for labels, summary in sorted(series.items()):
+                    for q in self.QUANTILES:
+                        value = summary.quantile(q)
+                        lines.append(f"{full}{self._format_labels(labels, (('quantile', str(q)),))} {value:.6g}")
+                    lines.append(f"{full}_sum{self._format_labels(labels)} {_format_value(summary.sum)}")
+                    lines.append(f"{full}_count{self._format_labels(labels)} {summary.count}")
+
+            for name, series in sorted(self._counters.items()):
+                full = self.PREFIX + name
+                lines.append(f"# HELP {full} {self._help.get(name, '')}")
+                lines.append(f"# TYPE {full} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{full}{self._format_labels(labels)} {_format_value(value)}")
+
+        for name, value in sorted((extra_gauges or {}).items()):
+            full = self.PREFIX + name
+            lines.append(f"# TYPE {full} gauge")
+            lines.append(f"{full} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the pipeline and /api/metrics/
+REGISTRY = MetricsRegistry()
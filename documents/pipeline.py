@@ -1,12 +1,22 @@
 from dataclasses import dataclass, asdict
-from typing import List, Optional, Any, Dict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Iterator, List, Optional, Any, Dict, Tuple, Union
+import asyncio
+import hashlib
+import json
 import os
+import threading
 
 import documents
 
-from .loaders import LoaderFactory, ExtractionResult
-from .llm.processor import LLMProcessor
+from . import metrics
+from .cache import ResultCache, get_default_cache
+from .extractors import ocr, ocr_pool, preprocess
+from .loaders import BaseLoader, LoaderFactory, ExtractionResult, Page, PDFLoader
+from .llm import get_llm_settings
+from .llm.processor import LLMProcessor, PROMPT_VERSION
 from .llm.schema import DocumentExtraction
+from .metrics import REGISTRY, StageTimings
 
 
 @dataclass
@@ -21,6 +31,7 @@ class DocumentResult:
     confidence: float
     summary: str
     error: Optional[str] = None
+    timings: Optional[Dict[str, Any]] = None
 
 
 
@@ -33,12 +44,143 @@ class BatchResult:
     failed: int
 
 
+# Source types whose documents may share a packed LLM request
+PACKABLE_SOURCE_TYPES = ('text', 'word')
+
+# A document to process: a file path, or (filename, content) for in-memory uploads
+Source = Union[str, Tuple[str, bytes]]
+
+
+def _extraction_settings() -> Dict[str, Any]:
+    """ Loader / OCR settings that change the extracted text """
+    return {
+        "ocr_backend": os.getenv('OCR_BACKEND', 'auto'),
+        "ocr_detect_script": os.getenv('OCR_DETECT_SCRIPT', 'auto').lower(),
+        "ocr_min_confidence": ocr.MIN_CONFIDENCE,
+        "ocr_line_height": preprocess.TARGET_LINE_HEIGHT,
+        "ocr_max_pixels": preprocess.MAX_PIXELS,
+        "pdf_min_page_chars": PDFLoader.MIN_PAGE_CHARS,
+    }
+
+
+def _split_source(source: Source) -> Tuple[str, Optional[bytes]]:
+    """ Return (file_path or filename, content or None) """
+    if isinstance(source, tuple):
+        return source
+    return source, None
+
+
+def _extract_file(file_path: str, data: Optional[bytes] = None) -> ExtractionResult:
+    """ Run the matching loader on a file, or on in-memory content when data is given.
+
+    Module level so it can be shipped to worker processes. Stage timings
+    travel back on the result since worker metrics are not shared.
+    """
+    with metrics.collect() as timings:
+        with metrics.timed('extract'):
+            loader = LoaderFactory.get_loader(file_path)
+            if data is not None:
+                result = loader.extract_bytes(data, os.path.basename(file_path))
+            else:
+                result = loader.extract(file_path)
+    result.timings = timings
+    return result
+
+
+class _PageStream:
+    """ Page texts from a loader, for LLMProcessor.process_stream()
+
+    Keeps what the final result needs (confidences, page errors) without
+    keeping the text, and times the loader work as the 'extract' stage.
+    """
+
+    def __init__(self, pages: Iterator[Page]):
+        self.pages = pages
+        self.confidences: List[float] = []
+        self.errors: List[str] = []
+        self.has_text = False
+        self.failed: Optional[str] = None
+
+    @property
+    def confidence(self) -> float:
+        """ Mean page confidence, as in ExtractionResult.from_pages() """
+        return sum(self.confidences) / len(self.confidences) if self.confidences else 0.0
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            try:
+                with metrics.timed('extract'):
+                    page = next(self.pages, None)
+            except Exception as e:
+                # Loader failed as a whole (unreadable file) - stop the stream
+                self.failed = str(e)
+                raise
+            if page is None:
+                return
+            self.confidences.append(page.confidence)
+            if page.error:
+                self.errors.append(page.error)
+            if page.text.strip():
+                self.has_text = True
+                yield page.text
+
 
 class Pipeline:
     """ Main pipeline  connects LLM and Loaders"""
 
-    def __init__(self):
-        self.processor = LLMProcessor()
+    def __init__(
+        self,
+        extract_workers: Optional[int] = None,
+        llm_workers: Optional[int] = None,
+        cache: Optional[ResultCache] = None,
+        use_cache: bool = True,
+        async_concurrency: Optional[int] = None,
+        record_timings: Optional[bool] = None,
+        processor: Optional[LLMProcessor] = None,
+        pack_documents: Optional[bool] = None,
+        pack_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            extract_workers : Processes used for loader/OCR work in process_batch
+                              (default: PIPELINE_EXTRACT_WORKERS or CPU count)
+            llm_workers     : Threads used for concurrent LLM calls in process_batch
+                              (default: PIPELINE_LLM_WORKERS or 4)
+            cache           : Result cache (default: built from PIPELINE_CACHE_* env)
+            use_cache       : Set False to disable result caching
+            async_concurrency : Max documents in flight in aprocess_batch
+                              (default: PIPELINE_ASYNC_CONCURRENCY or 16)
+            record_timings  : Attach per-stage timings to each DocumentResult
+                              (default: PIPELINE_RECORD_TIMINGS or False)
+            processor       : LLM stage to use (default: LLMProcessor())
+            pack_documents  : Send small text/Word documents of a batch to the LLM
+                              several per request (default: PIPELINE_PACK_DOCUMENTS or False)
+            pack_size       : Max documents per packed request
+                              (default: PIPELINE_PACK_SIZE or 4)
+        """
+        self.processor = processor if processor is not None else LLMProcessor()
+        self.llm_settings = get_llm_settings()
+        self.cache = (cache or get_default_cache()) if use_cache else None
+        self.extract_workers = max(1, extract_workers or int(os.getenv('PIPELINE_EXTRACT_WORKERS', os.cpu_count() or 1)))
+        self.llm_workers = max(1, llm_workers or int(os.getenv('PIPELINE_LLM_WORKERS', 4)))
+        self.async_concurrency = max(1, async_concurrency or int(os.getenv('PIPELINE_ASYNC_CONCURRENCY', 16)))
+        if record_timings is None:
+            record_timings = os.getenv('PIPELINE_RECORD_TIMINGS', 'false').lower() == 'true'
+        self.record_timings = record_timings
+        if pack_documents is None:
+            pack_documents = os.getenv('PIPELINE_PACK_DOCUMENTS', 'false').lower() == 'true'
+        self.pack_documents = pack_documents
+        self.pack_size = max(1, pack_size or int(os.getenv('PIPELINE_PACK_SIZE', 4)))
+
+        # Rules, chunking, OCR... settings in the cache key, so changing one
+        # does not keep serving results made with the old value
+        fingerprint = json.dumps({**_extraction_settings(), **self.processor.settings()}, sort_keys=True)
+        self.settings_version = hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:12]
+
+        # Worker pools are created on first concurrent batch and reused after that
+        self._extract_executor: Optional[ProcessPoolExecutor] = None
+        self._llm_executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
 
     def _get_source_type(self, file_path: str) -> str:
         """ Determine source type from file extension """
@@ -46,83 +188,176 @@ class Pipeline:
 
         if ext == '.pdf':
             return 'pdf'
-        elif ext in ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']:
+        elif ext in ['.png', '.jpg', '.jpeg', '.tiff', '.tif', '.bmp']:
             return 'image'
         elif ext == '.docx':
             return 'word'
         else:
             return 'text'
 
-    def process_single(self, file_path:str) -> DocumentResult:
+    def _error_result(self, file_path: str, error: str) -> DocumentResult:
+        """ Build a failed DocumentResult for a file """
+        return DocumentResult(
+            source=os.path.basename(file_path),
+            source_type=self._get_source_type(file_path),
+            document_type="unknown",
+            extracted_fields={},
+            expiry_date=None,
+            activation_date=None,
+            confidence=0.0,
+            summary="",
+            error=error,
+        )
+
+    def _cache_key(self, file_path: str, data: Optional[bytes] = None) -> Optional[str]:
+        """ Cache key from file content + model/provider/prompt version + settings fingerprint """
+        if self.cache is None:
+            return None
+        if data is not None:
+            content_hash = ResultCache.hash_bytes(data)
+        else:
+            try:
+                content_hash = ResultCache.hash_file(file_path)
+            except OSError:
+                return None
+        model = self.llm_settings['model']
+        if self.llm_settings['cascade_model']:
+            # Answers may come from the small model too
+            model = f"{model}+{self.llm_settings['cascade_model']}"
+        return ResultCache.make_key(
+            content_hash,
+            self.llm_settings['provider'],
+            model,
+            PROMPT_VERSION,
+            self.settings_version,
+        )
+
+    def _cached_result(self, file_path: str, key: Optional[str]) -> Optional[DocumentResult]:
+        """ Return cached result for this file (renamed to this upload), if any """
+        if key is None:
+            return None
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        cached.update(
+            source=os.path.basename(file_path),
+            source_type=self._get_source_type(file_path),
+        )
+        return DocumentResult(**cached)
+
+    def _store_result(self, key: Optional[str], result: DocumentResult):
+        """ Cache successful results only - failures are retried next time """
+        if key is not None and result.error is None:
+            value = asdict(result)
+            value['timings'] = None  # timings belong to the original run
+            self.cache.set(key, value)
+
+    def _record(self, result: DocumentResult, timings: StageTimings) -> DocumentResult:
+        """ Add document timings to the metrics registry (and to the result if enabled) """
+        REGISTRY.record_document(timings, result.source_type, result.error)
+        if self.record_timings:
+            result.timings = timings.as_dict()
+        return result
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """ Cache hit/miss counters, None when caching is disabled """
+        return self.cache.stats() if self.cache is not None else None
+
+    def process_single(self, file_path:str, data: Optional[bytes] = None) -> DocumentResult:
         """ Processes Single doc only
-        
-        Args : File path
+
+        Args :
+            file_path : File path, or just the file name when data is given
+            data      : In-memory file content (e.g. an upload) - read instead of the file
 
         Returns : Document Results for single doc
         """
 
-        source = os.path.basename(file_path)  #filename
-        source_type = self._get_source_type(file_path)
+        # S0 : Same file already processed with same model/prompt
+        key = self._cache_key(file_path, data)
+        cached = self._cached_result(file_path, key)
+        if cached is not None:
+            return cached
 
-        # S1 : Get Loader , Extract it
+        # S1 : Get Loader
         try:
             loader = LoaderFactory.get_loader(file_path)
-            extraction = loader.extract(file_path)
+        except Exception as e:
+            return self._record(self._error_result(file_path, f"Extraction failed {str(e)}"), StageTimings())
+
+        # S2 : Stream pages from the loader into the LLM chunker
+        with metrics.collect() as timings:
+            result = self._process_stream(file_path, loader, data)
+        result = self._record(result, timings)
+        self._store_result(key, result)
+        return result
+
+    def _process_stream(self, file_path: str, loader: BaseLoader, data: Optional[bytes] = None) -> DocumentResult:
+        """ LLM stage fed page by page while the loader is still extracting """
+        if data is not None:
+            pages = loader.iter_pages_bytes(data, os.path.basename(file_path))
+        else:
+            pages = loader.iter_pages(file_path)
+        stream = _PageStream(pages)
 
+        try:
+            llm_result = self.processor.process_stream(stream)
         except Exception as e:
-            return DocumentResult(
-                    source = source,
-                    source_type = source_type,
-                    document_type = "unknown",
-                    extracted_fields = {},
-                    expiry_date = None,
-                    activation_date = None,
-                    confidence = 0.0,
-                    summary = "",
-                    error = f"Extraction failed {str(e)}",
-            )
+            if stream.failed is not None:
+                return self._error_result(file_path, stream.failed)
+            if not stream.has_text:
+                return self._error_result(file_path, "; ".join(stream.errors) or loader.EMPTY_ERROR)
+            return self._error_result(file_path, f"LLM Processing Failed: {str(e)}")
 
-        #S2 : Check if Extraction is valid / succedded or not
+        extraction = ExtractionResult(text="", confidence=stream.confidence)
+        return self._build_result(file_path, extraction, llm_result)
+
+    def _extraction_error(self, file_path: str, extraction: ExtractionResult) -> Optional[DocumentResult]:
+        """ Check if Extraction is valid / succedded or not """
         if extraction.error or not extraction.text.strip():
-            return DocumentResult(
-                    source = source,
-                    source_type = source_type,
-                    document_type = "unknown",
-                    extracted_fields = {},
-                    expiry_date = None,
-                    activation_date = None,
-                    confidence = 0.0,
-                    summary = "",
-                    error = extraction.error or "No text extracted"
-            )
+            return self._error_result(file_path, extraction.error or "No text extracted")
 
         #         # DEBUG: Print extracted text to verify OCR quality
         # print(f"\n--- OCR EXTRACTED TEXT for {source} ---")
         # print(extraction.text)
         # print(f"--- END OCR TEXT (confidence: {extraction.confidence}) ---\n")
+        return None
+
+    def _process_extraction(self, file_path: str, extraction: ExtractionResult) -> DocumentResult:
+        """ Run the LLM stage on loader output, build and record the final result """
+        timings = extraction.timings or StageTimings()
+        with metrics.collect(timings):
+            result = self._run_llm_stage(file_path, extraction)
+        return self._record(result, timings)
+
+    def _run_llm_stage(self, file_path: str, extraction: ExtractionResult) -> DocumentResult:
+        """ Check loader output and run it through the LLM """
+
+        #S2 : Check if Extraction is valid / succedded or not
+        failed = self._extraction_error(file_path, extraction)
+        if failed is not None:
+            return failed
 
         # S3 : Process with LLM (with chunking support for large docs)
         try:
             llm_result = self.processor.process_chunked(extraction.text)
         except Exception as e:
-            return DocumentResult(
-                source=source,
-                source_type=source_type,
-                document_type="unknown",
-                extracted_fields={},
-                expiry_date=None,
-                activation_date=None,
-                confidence=0.0,
-                summary="",
-                error=f"LLM Processing Failed: {str(e)}",
-            )
-        
+            return self._error_result(file_path, f"LLM Processing Failed: {str(e)}")
+
+        return self._build_result(file_path, extraction, llm_result)
+
+    def _build_result(self, file_path: str, extraction: ExtractionResult, llm_result: DocumentExtraction) -> DocumentResult:
+        """ Combine loader and LLM output into the final result """
+
+        source = os.path.basename(file_path)  #filename
+        source_type = self._get_source_type(file_path)
+
         # S4 : Combine confidences and return
         # Final confidence = Loader confidence × LLM confidence
         # This ensures poor OCR (0.5) + good LLM (0.9) = 0.45 (correctly low)
         # And good text (1.0) + good LLM (0.9) = 0.9 (correctly high)
         combined_confidence = extraction.confidence * llm_result.confidence
-        
+
         return DocumentResult(
             source=source,
             source_type=source_type,
@@ -134,16 +369,273 @@ class Pipeline:
             summary=llm_result.summary,
         )
 
-    def process_batch(self, file_paths: List[str]) -> BatchResult:
-        """  Process multiple documents"""
+    def _get_extract_executor(self) -> ProcessPoolExecutor:
+        """ Lazily create the extraction process pool """
+        with self._executor_lock:
+            if self._extract_executor is None:
+                # Split the OCR workers between extraction processes so nested
+                # page pools do not multiply into workers x workers processes
+                ocr_workers = max(1, ocr_pool.get_workers() // self.extract_workers)
+                self._extract_executor = ProcessPoolExecutor(
+                    max_workers=self.extract_workers,
+                    mp_context=ocr_pool.mp_context(),
+                    initializer=ocr_pool.init_worker,
+                    initargs=(ocr_workers,),
+                )
+            return self._extract_executor
+
+    def _get_llm_executor(self) -> ThreadPoolExecutor:
+        """ Lazily create the LLM thread pool """
+        with self._executor_lock:
+            if self._llm_executor is None:
+                self._llm_executor = ThreadPoolExecutor(
+                    max_workers=self.llm_workers, thread_name_prefix='pipeline-llm'
+                )
+            return self._llm_executor
+
+    def warm_up(self) -> bool:
+        """ Load the model on the LLM server before the first real request
+
+        Returns : True if the warm-up call succeeded
+        """
+        try:
+            self.processor.warm_up()
+            return True
+        except Exception as e:
+            metrics.event('warmup_failed', error=str(e))
+            return False
+
+    def close(self):
+        """ Shut down worker pools (they are recreated on next use) """
+        with self._executor_lock:
+            if self._extract_executor is not None:
+                self._extract_executor.shutdown(wait=True, cancel_futures=True)
+                self._extract_executor = None
+            if self._llm_executor is not None:
+                self._llm_executor.shutdown(wait=True, cancel_futures=True)
+                self._llm_executor = None
+
+    def _finish_from_future(self, file_path: str, extraction_future: Future, key: Optional[str]) -> DocumentResult:
+        """ LLM stage for a file whose extraction ran in the process pool """
+        try:
+            extraction = extraction_future.result()
+        except Exception as e:
+            return self._record(self._error_result(file_path, f"Extraction failed {str(e)}"), StageTimings())
+        result = self._process_extraction(file_path, extraction)
+        self._store_result(key, result)
+        return result
+
+    def _iter_concurrent(self, sources: List[Source]) -> Iterator[Tuple[int, DocumentResult]]:
+        """ Staged batch: loaders in processes, LLM calls in threads.
+
+        Each document is handed to the LLM pool as soon as its extraction
+        finishes, so OCR of later files overlaps with LLM calls of earlier ones.
+        Yields (input index, result) in completion order.
+        """
+        extract_pool = self._get_extract_executor()
+        llm_pool = self._get_llm_executor()
+
+        items = [_split_source(source) for source in sources]
+        file_paths = [file_path for file_path, _ in items]
+
+        # Cache hits skip both stages
+        keys = [self._cache_key(file_path, data) for file_path, data in items]
+        misses = []
+        for i, (file_path, key) in enumerate(zip(file_paths, keys)):
+            cached = self._cached_result(file_path, key)
+            if cached is not None:
+                yield i, cached
+            else:
+                misses.append(i)
+
+        extract_futures: Dict[Future, int] = {
+            extract_pool.submit(_extract_file, *items[i]): i for i in misses
+        }
+        llm_futures: Dict[Future, int] = {}
+        pending = set(extract_futures)
+
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in extract_futures:
+                        i = extract_futures[future]
+                        llm_future = llm_pool.submit(self._finish_from_future, file_paths[i], future, keys[i])
+                        llm_futures[llm_future] = i
+                        pending.add(llm_future)
+                    else:
+                        yield llm_futures[future], future.result()
+        finally:
+            # Caller stopped early (e.g. client disconnected) - drop queued work
+            for future in pending:
+                future.cancel()
+
+    def _finish_pack(self, file_paths: List[str], extractions: List[ExtractionResult]) -> List[DocumentResult]:
+        """ LLM stage for several small documents in one request
+
+        If the packed request fails, each document is retried on its own
+        (process_packed already retries documents it has no answer for).
+        """
+        with metrics.collect() as pack_timings:
+            try:
+                llm_results = self.processor.process_packed([extraction.text for extraction in extractions])
+            except Exception as e:
+                llm_results = None
+                metrics.event('pack_failed', documents=len(extractions), error=str(e))
+
+        if llm_results is None:
+            return [
+                self._process_extraction(file_path, extraction)
+                for file_path, extraction in zip(file_paths, extractions)
+            ]
+
         results = []
-        for file_path in file_paths:
-            result = self.process_single(file_path)
-            results.append(result)
+        for file_path, extraction, llm_result in zip(file_paths, extractions, llm_results):
+            # Every document waited for the whole request (counts such as
+            # rules hits belong to the pack, not to each document)
+            timings = extraction.timings or StageTimings()
+            for stage, seconds in pack_timings.durations.items():
+                timings.add(stage, seconds)
+            results.append(self._record(self._build_result(file_path, extraction, llm_result), timings))
+        return results
+
+    def _submit_held(self, file_paths: List[str], held: Dict[int, ExtractionResult]) -> Dict[Future, List[int]]:
+        """ LLM stage for the extracted text/Word documents: packs of small
+        ones, everything else on its own. Each future returns the results of
+        its indices, in order. """
+        llm_pool = self._get_llm_executor()
+        futures: Dict[Future, List[int]] = {}
+        small = [i for i in held if self._extraction_error(file_paths[i], held[i]) is None]
+        singles = [i for i in held if i not in small]
+        for pack in self.processor.plan_packs([held[i].text for i in small], self.pack_size):
+            indices = [small[n] for n in pack]
+            if len(indices) == 1:
+                singles.extend(indices)
+                continue
+            future = llm_pool.submit(self._finish_pack, [file_paths[i] for i in indices], [held[i] for i in indices])
+            futures[future] = indices
+        for i in singles:
+            future = llm_pool.submit(lambda i=i: [self._process_extraction(file_paths[i], held[i])])
+            futures[future] = [i]
+        return futures
+
+    def _iter_packed(self, sources: List[Source]) -> Iterator[Tuple[int, DocumentResult]]:
+        """ Batch with request packing: small text/Word documents go to the
+        LLM several per request, on the LLM thread pool. Yields (input index,
+        result) in completion order.
+
+        Packing needs the text sizes before any LLM call, so only text/Word
+        documents are held back until all of them are extracted. PDFs and
+        images go to the LLM as soon as each is extracted, as in
+        _iter_concurrent.
+        """
+        extract_pool = self._get_extract_executor()
+        llm_pool = self._get_llm_executor()
+
+        items = [_split_source(source) for source in sources]
+        file_paths = [file_path for file_path, _ in items]
+
+        # S0 : Cache hits skip both stages
+        keys = [self._cache_key(file_path, data) for file_path, data in items]
+        misses = []
+        for i, (file_path, key) in enumerate(zip(file_paths, keys)):
+            cached = self._cached_result(file_path, key)
+            if cached is not None:
+                yield i, cached
+            else:
+                misses.append(i)
+
+        # S1 : Extract - packable documents first, they are quick and the packs wait for them
+        packable = [i for i in misses if self._get_source_type(file_paths[i]) in PACKABLE_SOURCE_TYPES]
+        held_back = set(packable)
+        others = [i for i in misses if i not in held_back]
+        extract_futures: Dict[Future, int] = {
+            extract_pool.submit(_extract_file, *items[i]): i for i in packable + others
+        }
+        held: Dict[int, ExtractionResult] = {}
+        waiting = len(packable)
+        llm_futures: Dict[Future, List[int]] = {}
+        pending = set(extract_futures)
+
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in extract_futures:
+                        i = extract_futures[future]
+                        if i not in held_back:
+                            # S2 : PDFs and images straight to the LLM
+                            llm_future = llm_pool.submit(lambda i=i, f=future: [self._finish_from_future(file_paths[i], f, None)])
+                            llm_futures[llm_future] = [i]
+                            pending.add(llm_future)
+                            continue
+
+                        waiting -= 1
+                        try:
+                            held[i] = future.result()
+                        except Exception as e:
+                            yield i, self._record(self._error_result(file_paths[i], f"Extraction failed {str(e)}"), StageTimings())
+                        if waiting == 0 and held:
+                            # S3 : All text/Word documents extracted - packs and the rest
+                            packs = self._submit_held(file_paths, held)
+                            llm_futures.update(packs)
+                            pending.update(packs)
+                    else:
+                        for i, result in zip(llm_futures[future], future.result()):
+                            self._store_result(keys[i], result)
+                            yield i, result
+        finally:
+            # Caller stopped early (e.g. client disconnected) - drop queued work
+            for future in pending:
+                future.cancel()
+
+    def _iter_indexed(self, sources: List[Source]) -> Iterator[Tuple[int, DocumentResult]]:
+        """ Yield (input index, result) as documents finish """
+        if len(sources) > 1 and self.pack_documents:
+            yield from self._iter_packed(sources)
+        elif len(sources) > 1 and (self.extract_workers > 1 or self.llm_workers > 1):
+            yield from self._iter_concurrent(sources)
+        else:
+            for i, source in enumerate(sources):
+                yield i, self.process_single(*_split_source(source))
+
+    def iter_batch(self, file_paths: List[Source]) -> Iterator[DocumentResult]:
+        """ Process multiple documents, yielding each result as soon as it
+        is ready (completion order, not input order)
+
+        Args : file paths and/or (filename, content) tuples
+        """
+        for _, result in self._iter_indexed(file_paths):
+            yield result
+
+    def iter_batch_indexed(self, file_paths: List[Source]) -> Iterator[Tuple[int, DocumentResult]]:
+        """ iter_batch() with the input index of each result, for callers
+        that must match results to inputs (filenames may repeat)
+
+        Args : file paths and/or (filename, content) tuples
+        """
+        return self._iter_indexed(file_paths)
+
+    def process_batch(self, file_paths: List[Source]) -> BatchResult:
+        """  Process multiple documents
+
+        Runs concurrently when there is more than one file and more than one
+        worker configured, otherwise one after another. Results are in
+        input order.
+
+        Args : file paths and/or (filename, content) tuples
+        """
+        results: List[Optional[DocumentResult]] = [None] * len(file_paths)
+        for i, result in self._iter_indexed(file_paths):
+            results[i] = result
+
+        return self._batch_result(results)
 
+    def _batch_result(self, results: List[DocumentResult]) -> BatchResult:
+        """ Count successes/failures for a list of results """
         successful = sum(1 for r in results if r.error is None)
         failed = len(results) - successful
-        
+
         return BatchResult(
             documents=results,
             total=len(results),
@@ -151,17 +643,98 @@ class Pipeline:
             failed=failed
         )
 
+    async def aprocess_single(self, file_path: str, data: Optional[bytes] = None) -> DocumentResult:
+        """ Async version of process_single()
 
+        Loader/OCR work runs in the extraction process pool and the LLM
+        call uses ainvoke, so the event loop is never blocked.
+
+        Args :
+            file_path : File path, or just the file name when data is given
+            data      : In-memory file content
+
+        Returns : Document Results for single doc
+        """
+        loop = asyncio.get_running_loop()
+
+        # S0 : Cache lookup (file hashing + SQLite read off the event loop)
+        key = await loop.run_in_executor(None, self._cache_key, file_path, data)
+        if key is not None:
+            cached = await loop.run_in_executor(None, self._cached_result, file_path, key)
+            if cached is not None:
+                return cached
+
+        # S1 : Extract in worker process
+        try:
+            extraction = await loop.run_in_executor(self._get_extract_executor(), _extract_file, file_path, data)
+        except Exception as e:
+            return self._record(self._error_result(file_path, f"Extraction failed {str(e)}"), StageTimings())
 
+        timings = extraction.timings or StageTimings()
+        with metrics.collect(timings):
+            result = await self._arun_llm_stage(file_path, extraction)
+        result = self._record(result, timings)
 
+        if key is not None:
+            await loop.run_in_executor(None, self._store_result, key, result)
+        return result
+
+    async def _arun_llm_stage(self, file_path: str, extraction: ExtractionResult) -> DocumentResult:
+        """ Async version of _run_llm_stage() """
+
+        # S2 : Check extraction
+        failed = self._extraction_error(file_path, extraction)
+        if failed is not None:
+            return failed
+
+        # S3 : LLM
+        try:
+            llm_result = await self.processor.aprocess_chunked(extraction.text)
+        except Exception as e:
+            return self._error_result(file_path, f"LLM Processing Failed: {str(e)}")
+
+        return self._build_result(file_path, extraction, llm_result)
+
+    async def aprocess_batch(self, file_paths: List[Source], concurrency: Optional[int] = None) -> BatchResult:
+        """ Async version of process_batch()
+
+        Args:
+            file_paths  : File paths and/or (filename, content) tuples
+            concurrency : Max documents in flight (default: self.async_concurrency)
+
+        Returns : BatchResult with documents in input order
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.async_concurrency)
 
+        async def run(source: Source) -> DocumentResult:
+            async with semaphore:
+                return await self.aprocess_single(*_split_source(source))
 
+        results = await asyncio.gather(*(run(source) for source in file_paths))
+        return self._batch_result(list(results))
 
 
+_shared_pipeline: Optional[Pipeline] = None
+_shared_pid: Optional[int] = None
+_shared_lock = threading.Lock()
 
 
+def get_pipeline() -> Pipeline:
+    """ Process-wide shared Pipeline
 
+    Built once per worker process and reused by every request, so the LLM
+    client (with its keep-alive connection pool), prompt, splitter, cache and
+    worker pools are set up only once. A forked child builds its own copy
+    instead of reusing the parent's connections.
+    """
+    global _shared_pipeline, _shared_pid
 
+    pid = os.getpid()
+    if _shared_pipeline is not None and _shared_pid == pid:
+        return _shared_pipeline
 
-        
-        
\ No newline at end of file
+    with _shared_lock:
+        if _shared_pipeline is None or _shared_pid != pid:
+            _shared_pipeline = Pipeline()
+            _shared_pid = pid
+        return _shared_pipeline
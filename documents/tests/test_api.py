@@ -0,0 +1,112 @@
+"""API tests against the fake LLM provider (no Ollama needed)."""
+import io
+import json
+import threading
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+
+from documents import jobs
+from documents import pipeline as pipeline_module
+from documents.management.commands.process_jobs import Command
+
+
+def upload(path):
+    with open(path, "rb") as f:
+        return SimpleUploadedFile(path.rsplit("/", 1)[-1], f.read())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """ Test client whose shared pipeline uses the fake LLM, no cache and
+    no worker pools """
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.setenv("LLM_RULES", "false")
+    monkeypatch.setenv("PIPELINE_CACHE", "false")
+    monkeypatch.setenv("PIPELINE_EXTRACT_WORKERS", "1")
+    monkeypatch.setenv("PIPELINE_LLM_WORKERS", "1")
+    monkeypatch.setattr(pipeline_module, "_shared_pipeline", None)
+    yield Client()
+    if pipeline_module._shared_pipeline is not None:
+        pipeline_module._shared_pipeline.close()
+
+
+def ndjson_lines(response):
+    return [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+
+def test_process_streams_ndjson(client):
+    response = client.post(
+        "/api/process/?stream=ndjson",
+        {"documents": [
+            upload("samples/txtfiles/trial_license.txt"),
+            SimpleUploadedFile("same.txt", b""),
+            SimpleUploadedFile("same.txt", b"Gym membership"),
+        ]},
+    )
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = ndjson_lines(response)
+    # One line per document, then the metadata line
+    assert len(lines) == 4
+    # Repeated filenames are told apart by the upload index
+    documents = {line["index"]: line["document"] for line in lines[:3]}
+    assert documents[0]["expiry_date"] == "2028-09-01"
+    assert documents[1]["error"] and documents[1]["source"] == "same.txt"
+    assert documents[2]["error"] is None and documents[2]["source"] == "same.txt"
+    assert lines[3] == {"metadata": {"total": 3, "successful": 2, "failed": 1}}
+
+
+def test_process_stream_reports_failure_as_error_line(client, monkeypatch):
+    def broken(self, sources):
+        raise RuntimeError("pool died")
+        yield
+
+    monkeypatch.setattr(pipeline_module.Pipeline, "iter_batch_indexed", broken)
+
+    response = client.post(
+        "/api/process/", {"documents": [upload("samples/txtfiles/trial_license.txt")]},
+        HTTP_ACCEPT="application/x-ndjson",
+    )
+
+    assert response.status_code == 200
+    assert ndjson_lines(response) == [{"error": "Processing failed: pool died"}]
+
+
+@pytest.fixture
+def job_store(tmp_path, monkeypatch):
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs, "_shared_store", store)
+    yield store
+    store.close()
+
+
+def test_create_job_and_poll_status(client, job_store):
+    response = client.post("/api/jobs/", {"documents": [upload("samples/txtfiles/trial_license.txt")]})
+
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.json() == {"job_id": job_id, "status": "queued", "total": 1, "status_url": f"/api/jobs/{job_id}/"}
+    assert client.get(f"/api/jobs/{job_id}/").json()["status"] == "queued"
+
+    # What `manage.py process_jobs --once` does in each worker thread
+    Command(stdout=io.StringIO())._work(
+        job_store, pipeline_module.get_pipeline(), {"once": True, "poll_interval": 0}, threading.Event(),
+    )
+
+    job = client.get(f"/api/jobs/{job_id}/").json()
+    assert job["status"] == "completed"
+    assert job["documents"][0]["result"]["expiry_date"] == "2028-09-01"
+
+
+def test_create_job_without_files(client, job_store):
+    assert client.post("/api/jobs/", {}).status_code == 400
+
+
+def test_unknown_job_status(client, job_store):
+    response = client.get("/api/jobs/missing/")
+
+    assert response.status_code == 404
+    assert response.json() == {"error": "Unknown job: missing"}
@@ -0,0 +1,51 @@
+"""Startup warm-up only in the process that serves requests."""
+import importlib
+import sys
+import threading
+
+import pytest
+
+from documents import apps
+from documents.apps import serves_requests
+
+
+@pytest.mark.parametrize("argv, run_main, expected", [
+    (["manage.py", "runserver"], "true", True),         # autoreloader child
+    (["manage.py", "runserver"], None, False),          # autoreloader parent
+    (["manage.py", "runserver", "--noreload"], None, True),
+    (["manage.py", "migrate"], None, False),
+    (["manage.py", "process_jobs"], "true", False),
+    (["pytest", "-q"], None, False),
+])
+def test_serves_requests(monkeypatch, argv, run_main, expected):
+    if run_main is None:
+        monkeypatch.delenv("RUN_MAIN", raising=False)
+    else:
+        monkeypatch.setenv("RUN_MAIN", run_main)
+
+    assert serves_requests(argv) is expected
+
+
+def test_start_warm_up_once_per_process(monkeypatch):
+    calls = []
+    monkeypatch.setattr(apps, "_warm_up", lambda: calls.append(1))
+    monkeypatch.setattr(apps, "_warm_up_started", False)
+    monkeypatch.setenv("PIPELINE_WARMUP", "true")
+
+    assert apps.start_warm_up() is True
+    assert apps.start_warm_up() is False
+    for thread in threading.enumerate():
+        if thread.name == "pipeline-warmup":
+            thread.join(5)
+    assert calls == [1]
+
+
+@pytest.mark.parametrize("module", ["config.wsgi", "config.asgi"])
+def test_server_entry_points_warm_up(monkeypatch, module):
+    calls = []
+    monkeypatch.setattr(apps, "start_warm_up", lambda: calls.append(module))
+    monkeypatch.delitem(sys.modules, module, raising=False)
+
+    importlib.import_module(module)
+
+    assert calls == [module]
@@ -0,0 +1,82 @@
+import time
+
+from documents.cache import ResultCache
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResultCache(path=str(tmp_path / "results.sqlite3"), **kwargs)
+
+
+def test_hit_and_miss_counts(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get("a") is None
+
+    cache.set("a", {"document_type": "invoice"})
+    assert cache.get("a") == {"document_type": "invoice"}
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    make_cache(tmp_path).set("a", {"document_type": "invoice"})
+
+    cache = make_cache(tmp_path)
+    assert cache.get("a") == {"document_type": "invoice"}
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_get_returns_copy(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("a", {"fields": {"name": "x"}})
+    cache.get("a")["fields"]["name"] = "changed"
+    assert cache.get("a") == {"fields": {"name": "x"}}
+
+
+def test_size_eviction(tmp_path):
+    cache = make_cache(tmp_path, max_memory_entries=2, max_disk_entries=2)
+    for key in ["a", "b", "c"]:
+        cache.set(key, {"key": key})
+        time.sleep(0.01)
+
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.stats()["disk_entries"] == 2
+    assert cache.get("a") is None
+    assert cache.get("c") == {"key": "c"}
+
+
+def test_ttl_expiry(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=0.05)
+    cache.set("a", {"key": "a"})
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_key_changes_with_prompt_version():
+    key_v1 = ResultCache.make_key("abc", "ollama", "llama3.1:8b", "v1")
+    key_v2 = ResultCache.make_key("abc", "ollama", "llama3.1:8b", "v2")
+    assert key_v1 != key_v2
+
+
+def test_key_changes_with_result_settings(tmp_path, monkeypatch):
+    from documents.llm.fake import FakeChatModel
+    from documents.llm.processor import LLMProcessor
+    from documents.loaders import PDFLoader
+    from documents.pipeline import Pipeline
+
+    def key(use_rules=True):
+        processor = LLMProcessor(llm=FakeChatModel(), use_rules=use_rules)
+        return Pipeline(processor=processor, cache=make_cache(tmp_path))._cache_key("scan.pdf", b"%PDF")
+
+    base = key()
+    assert key() == base
+    assert key(use_rules=False) != base
+
+    monkeypatch.setenv("OCR_DETECT_SCRIPT", "false")
+    assert key() != base
+    monkeypatch.delenv("OCR_DETECT_SCRIPT")
+
+    monkeypatch.setattr(PDFLoader, "MIN_PAGE_CHARS", 50)
+    assert key() != base
@@ -0,0 +1,75 @@
+"""Small-model-first cascade tests (FakeChatModel as both models)."""
+import pytest
+
+from documents import metrics
+from documents.llm.fake import DEFAULT_EXTRACTION, FakeChatModel
+from documents.llm.processor import LLMProcessor
+from documents.metrics import REGISTRY
+
+
+TEXT = "ACME INVOICE\nInvoice No: INV-20931\nIssue Date: 09/01/2025\nValid Through: 09/28\n"
+
+
+def make_processor(small_response):
+    small = FakeChatModel(responses=[small_response])
+    large = FakeChatModel()
+    processor = LLMProcessor(llm=large, small_llm=small, use_rules=False)
+    return processor, small, large
+
+
+def test_confident_small_answer_is_kept():
+    processor, small, large = make_processor(DEFAULT_EXTRACTION.model_copy(update={"document_type": "invoice"}))
+    result = processor.process(TEXT)
+    assert result.document_type == "invoice"
+    assert (small.calls, large.calls) == (1, 0)
+
+
+def test_escalation_reasons():
+    REGISTRY.reset()
+    bad_answers = [
+        {"confidence": 0.3},                  # low confidence
+        {"expiry_date": None},                # cue in text, date missing
+        {"activation_date": "01/09/2025"},    # not ISO
+    ]
+    for update in bad_answers:
+        processor, small, large = make_processor(
+            DEFAULT_EXTRACTION.model_copy(update={"document_type": "invoice", **update})
+        )
+        result = processor.process(TEXT)
+        assert (small.calls, large.calls) == (1, 1)
+        assert result == DEFAULT_EXTRACTION
+
+    rendered = REGISTRY.render()
+    assert 'doc_pipeline_cascade_total{document_type="invoice",outcome="escalated"} 3' in rendered
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+def test_escalations_counted_on_chunked_paths(monkeypatch, streamed):
+    monkeypatch.setenv("LLM_EARLY_STOP", "true")
+    processor, small, large = make_processor(DEFAULT_EXTRACTION.model_copy(update={"confidence": 0.3}))
+    processor.max_concurrency = 4
+    chunks = [f"Chunk {n}: " + "x" * 80 for n in range(10)]
+    monkeypatch.setattr(processor, "_split", lambda text: chunks)
+    # One chunk per page in the streamed path
+    monkeypatch.setattr(processor, "_iter_chunks", lambda pages: iter(pages))
+
+    with metrics.collect() as timings:
+        if streamed:
+            processor.process_stream(chunks)
+        else:
+            processor.process_chunked("\n".join(chunks))
+
+    assert small.calls == 10
+    assert timings.counts["llm_escalations"] == 10
+
+
+def test_unknown_document_types_counted_as_other():
+    REGISTRY.reset()
+    for document_type in ('Boarding "pass"', "Passport "):
+        processor, small, large = make_processor(DEFAULT_EXTRACTION.model_copy(update={"document_type": document_type}))
+        processor.process(TEXT)
+
+    rendered = REGISTRY.render()
+    assert 'doc_pipeline_cascade_total{document_type="other",outcome="accepted"} 1' in rendered
+    assert 'doc_pipeline_cascade_total{document_type="passport",outcome="accepted"} 1' in rendered
+    assert "Boarding" not in rendered
@@ -0,0 +1,79 @@
+"""ImageLoader OCR flow (OCR backend replaced by a stub)."""
+import io
+
+import pytest
+from PIL import Image
+
+from documents import metrics
+from documents.extractors import ocr, ocr_pool, preprocess
+from documents.loaders.image_loader import ImageLoader
+
+
+class StubOCR(ocr.OCRBackend):
+    """ Reads "text" confidently only from images at least min_width wide """
+
+    def __init__(self, min_width=0):
+        self.min_width = min_width
+        self.sizes = []
+
+    def image_to_data(self, image, lang=ocr.DEFAULT_LANG, psm=ocr.DEFAULT_PSM):
+        self.sizes.append(image.size)
+        confidence = 95.0 if image.width >= self.min_width else 20.0
+        return ocr.OCRResult.from_words([ocr.OCRWord("text", confidence, (0, 0, 40, 20), block=0, line=0)])
+
+
+def png_bytes(size):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def small_pixel_cap(monkeypatch):
+    monkeypatch.setattr(preprocess, "MAX_PIXELS", 250_000)
+    monkeypatch.setenv("OCR_DETECT_SCRIPT", "false")
+
+
+def test_oversized_image_is_downscaled(monkeypatch):
+    backend = StubOCR()
+    monkeypatch.setattr(ocr, "_backend", backend)
+
+    result = ImageLoader().extract_bytes(png_bytes((1000, 1000)), "photo.png")
+
+    assert result.text == "text"
+    assert result.confidence == pytest.approx(0.95)
+    assert backend.sizes == [(500, 500)]
+
+
+def test_original_is_retried_when_downscaled_pass_scores_low(monkeypatch):
+    backend = StubOCR(min_width=1000)
+    monkeypatch.setattr(ocr, "_backend", backend)
+
+    with metrics.collect() as timings:
+        result = ImageLoader().extract_bytes(png_bytes((1000, 1000)), "photo.png")
+
+    assert result.confidence == pytest.approx(0.95)
+    assert timings.counts["ocr_retries"] == 1
+    assert backend.sizes[-1][0] >= 1000
+
+
+class WidthOCR(ocr.OCRBackend):
+    """ Reads each frame's width, so frame order is visible in the text """
+
+    def image_to_data(self, image, lang=ocr.DEFAULT_LANG, psm=ocr.DEFAULT_PSM):
+        return ocr.OCRResult.from_words([ocr.OCRWord(f"w{image.width}", 80.0, (0, 0, 40, 20), block=0, line=0)])
+
+
+def test_multi_frame_tiff_reads_every_frame_in_order(monkeypatch):
+    monkeypatch.setattr(ocr, "_backend", WidthOCR())
+    monkeypatch.setattr(ocr_pool, "_workers", 1)  # OCR inline so the stub applies
+    frames = [Image.new("1", (width, 100), 1) for width in (300, 100, 200)]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format="TIFF", save_all=True, append_images=frames[1:])
+
+    with metrics.collect() as timings:
+        result = ImageLoader().extract_bytes(buffer.getvalue(), "fax.tif")
+
+    assert result.text == "w300\nw100\nw200"
+    assert result.confidence == pytest.approx(0.8)
+    assert timings.counts["pages_ocr"] == 3
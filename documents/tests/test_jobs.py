@@ -0,0 +1,128 @@
+import io
+import sqlite3
+import threading
+import time
+
+from documents.jobs import JobStore
+from documents.management.commands.process_jobs import Command
+from documents.pipeline import Pipeline
+
+
+def make_store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_enqueue_claim_complete(tmp_path):
+    store = make_store(tmp_path)
+    job_id = store.enqueue([("a.txt", b"first"), ("b.txt", b"second")])
+    assert store.get_job(job_id)["status"] == "queued"
+
+    item = store.claim()
+    assert (item["job_id"], item["index"], item["content"]) == (job_id, 0, b"first")
+    store.complete(job_id, 0, {"source": "a.txt", "error": None})
+
+    job = store.get_job(job_id)
+    assert job["status"] == "running"
+    assert job["progress"]["completed"] == 1
+    assert job["documents"][0]["result"] == {"source": "a.txt", "error": None}
+
+    item = store.claim()
+    store.complete(job_id, item["index"], {"source": "b.txt", "error": "No text extracted"})
+
+    job = store.get_job(job_id)
+    assert job["status"] == "completed"
+    assert job["progress"] == {"total": 2, "completed": 2, "successful": 1, "failed": 1}
+    assert store.claim() is None
+
+
+def test_queue_is_durable(tmp_path):
+    job_id = make_store(tmp_path).enqueue([("a.txt", b"first")])
+    assert make_store(tmp_path).claim()["job_id"] == job_id
+
+
+def test_requeue_stale(tmp_path):
+    store = make_store(tmp_path)
+    store.enqueue([("a.txt", b"first")])
+    store.claim()
+    time.sleep(0.05)
+
+    assert store.requeue_stale(older_than=0.01) == 1
+    assert store.claim()["filename"] == "a.txt"
+
+
+def test_unknown_job(tmp_path):
+    assert make_store(tmp_path).get_job("missing") is None
+
+
+class LockedPipeline(Pipeline):
+    """ Fails the first document like a locked cache database would """
+
+    def __init__(self):
+        super().__init__(use_cache=False)
+        self.calls = 0
+
+    def process_single(self, file_path, data=None):
+        self.calls += 1
+        if self.calls == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return self._error_result(file_path, "No text extracted")
+
+
+def test_worker_survives_failing_document(tmp_path):
+    store = make_store(tmp_path)
+    job_id = store.enqueue([("a.txt", b"first"), ("b.txt", b"second")])
+    command = Command(stdout=io.StringIO(), stderr=io.StringIO())
+
+    command._work(store, LockedPipeline(), {"once": True, "poll_interval": 0}, threading.Event())
+
+    job = store.get_job(job_id)
+    assert job["status"] == "completed"
+    assert job["documents"][0]["result"]["error"] == "Processing failed: database is locked"
+    assert job["documents"][1]["status"] == "done"
+    assert "database is locked" in command.stderr.getvalue()
+
+
+class SlowPipeline(Pipeline):
+    """ Blocks in process_single until released """
+
+    def __init__(self):
+        super().__init__(use_cache=False)
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def process_single(self, file_path, data=None):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(10)
+        return self._error_result(file_path, "No text extracted")
+
+
+def test_long_document_on_live_worker_is_not_requeued(tmp_path):
+    store = make_store(tmp_path)
+    job_id = store.enqueue([("scan.pdf", b"%PDF")])
+    command = Command(stdout=io.StringIO(), stderr=io.StringIO())
+    pipeline = SlowPipeline()
+    worker = threading.Thread(
+        target=command._work, args=(store, pipeline, {"once": True, "poll_interval": 0}, threading.Event()),
+    )
+    worker.start()
+    assert pipeline.started.wait(10)
+
+    # Processing outlasts --stale-after, but the heartbeat keeps the claim
+    for _ in range(3):
+        time.sleep(0.1)
+        command._tick(store, stale_after=0.15)
+    assert store.claim() is None
+
+    pipeline.release.set()
+    worker.join(10)
+    assert pipeline.calls == 1
+    assert store.get_job(job_id)["status"] == "completed"
+
+    # A claim nobody refreshes (its worker died) is still requeued
+    store.enqueue([("lost.pdf", b"%PDF")])
+    store.claim()
+    time.sleep(0.2)
+    command._tick(store, stale_after=0.15)
+    assert store.claim()["filename"] == "lost.pdf"
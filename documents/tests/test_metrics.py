@@ -0,0 +1,124 @@
+"""Stage timings, the Prometheus registry and /api/metrics/."""
+import threading
+
+import pytest
+from django.test import Client
+
+from documents import metrics
+from documents import pipeline as pipeline_module
+from documents.llm.fake import FakeChatModel
+from documents.llm.processor import LLMProcessor
+from documents.metrics import MetricsRegistry, StageTimings
+from documents.pipeline import Pipeline
+
+
+def test_collect_times_stages_and_counts():
+    @metrics.timed("decorated")
+    def work():
+        metrics.count("pages_ocr", 2)
+
+    with metrics.collect() as timings:
+        with metrics.timed("extract"):
+            work()
+        with metrics.timed("extract"):
+            metrics.count("pages_ocr")
+
+    assert set(timings.durations) == {"extract", "decorated"}
+    assert timings.durations["extract"] >= timings.durations["decorated"]
+    assert timings.counts == {"pages_ocr": 3}
+
+
+def test_collect_outside_block_and_per_thread():
+    # No collector - nothing to record into, and no error
+    with metrics.timed("extract"):
+        metrics.count("chunks")
+
+    other = StageTimings()
+
+    def in_thread():
+        with metrics.collect(other):
+            metrics.count("chunks", 5)
+
+    with metrics.collect() as timings:
+        thread = threading.Thread(target=in_thread)
+        thread.start()
+        thread.join()
+        metrics.count("chunks")
+
+    assert timings.counts == {"chunks": 1}
+    assert other.counts == {"chunks": 5}
+
+
+def test_render_quantiles_labels_and_gauges():
+    registry = MetricsRegistry()
+    for value in range(1, 101):
+        registry.observe("stage_seconds", value, "Time per stage", stage="llm")
+    registry.inc("documents_total", 1, "Processed documents", status="ok", source_type="pdf")
+    registry.inc("documents_total", 2, "Processed documents", status="ok", source_type="pdf")
+
+    lines = registry.render(extra_gauges={"cache_hit_rate": 0.25}).splitlines()
+
+    assert lines[:7] == [
+        "# HELP doc_pipeline_stage_seconds Time per stage",
+        "# TYPE doc_pipeline_stage_seconds summary",
+        'doc_pipeline_stage_seconds{stage="llm",quantile="0.5"} 51',
+        'doc_pipeline_stage_seconds{stage="llm",quantile="0.95"} 96',
+        'doc_pipeline_stage_seconds{stage="llm",quantile="0.99"} 100',
+        'doc_pipeline_stage_seconds_sum{stage="llm"} 5050',
+        'doc_pipeline_stage_seconds_count{stage="llm"} 100',
+    ]
+    # Labels in sorted order, counts added up
+    assert 'doc_pipeline_documents_total{source_type="pdf",status="ok"} 3' in lines
+    assert lines[-2:] == ["# TYPE doc_pipeline_cache_hit_rate gauge", "doc_pipeline_cache_hit_rate 0.25"]
+
+
+def test_render_keeps_full_precision():
+    registry = MetricsRegistry()
+    registry.inc("documents_total", 1234567, "Processed documents")
+    registry.observe("stage_seconds", 1.234567891, "Time per stage")
+
+    lines = registry.render(extra_gauges={"cache_entries": 2345678}).splitlines()
+
+    assert "doc_pipeline_documents_total 1234567" in lines
+    assert "doc_pipeline_stage_seconds_sum 1.234567891" in lines
+    assert "doc_pipeline_cache_entries 2345678" in lines
+
+
+def test_render_escapes_label_values():
+    registry = MetricsRegistry()
+    registry.inc("cascade_total", 1, "Cascade outcomes", document_type='a "b" \\ c\nd')
+
+    assert r'doc_pipeline_cascade_total{document_type="a \"b\" \\ c\nd"} 1' in registry.render().splitlines()
+
+
+@pytest.mark.parametrize("record, expected", [("true", True), ("false", False)])
+def test_record_timings_env(monkeypatch, record, expected):
+    monkeypatch.setenv("PIPELINE_RECORD_TIMINGS", record)
+    pipeline = Pipeline(processor=LLMProcessor(llm=FakeChatModel(), use_rules=False), use_cache=False)
+
+    result = pipeline.process_single("samples/txtfiles/trial_license.txt")
+
+    assert result.error is None
+    if expected:
+        assert {"extract", "chunking", "llm"} <= set(result.timings["stages"])
+        assert result.timings["counts"]["chunks"] == 1
+    else:
+        assert result.timings is None
+
+
+def test_metrics_endpoint(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.setenv("PIPELINE_CACHE", "false")
+    monkeypatch.setattr(pipeline_module, "_shared_pipeline", None)
+    registry = MetricsRegistry()
+    registry.record_document(StageTimings(durations={"llm": 0.5}, counts={"chunks": 2}), "text", None)
+    monkeypatch.setattr("documents.api.views.REGISTRY", registry)
+
+    response = Client().get("/api/metrics/")
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = response.content.decode()
+    assert 'doc_pipeline_stage_seconds_count{stage="llm"} 1' in body
+    assert 'doc_pipeline_chunks{quantile="0.5"} 2' in body
+    assert 'doc_pipeline_documents_total{source_type="text",status="ok"} 1' in body
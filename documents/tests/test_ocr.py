@@ -0,0 +1,184 @@
+"""OCR backend selection."""
+import io
+import types
+
+import pytest
+from PIL import Image
+
+from documents.extractors import ocr
+from documents.loaders.image_loader import ImageLoader
+
+
+def test_auto_falls_back_to_pytesseract_without_tesserocr(monkeypatch):
+    def missing():
+        raise ImportError("No module named 'tesserocr'")
+
+    monkeypatch.setattr(ocr.TesserocrBackend, "__init__", lambda self: missing())
+
+    assert isinstance(ocr._create_backend("auto"), ocr.PytesseractBackend)
+    assert isinstance(ocr._create_backend("pytesseract"), ocr.PytesseractBackend)
+    with pytest.raises(ImportError):
+        ocr._create_backend("tesserocr")
+    with pytest.raises(ValueError):
+        ocr._create_backend("easyocr")
+
+
+def test_tesserocr_without_osd_data_skips_detection():
+    calls = []
+
+    def missing_osd(**kwargs):
+        calls.append(kwargs["lang"])
+        raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+
+    backend = ocr.TesserocrBackend.__new__(ocr.TesserocrBackend)
+    psm = lambda value: value
+    psm.OSD_ONLY = 0
+    backend._tesserocr = types.SimpleNamespace(PyTessBaseAPI=missing_osd, PSM=psm, OEM=types.SimpleNamespace(DEFAULT=3))
+    backend._pools = {}
+    backend._lock = ocr.threading.Lock()
+    backend._osd_available = True
+    image = Image.new("L", (20, 10), 255)
+
+    assert backend.detect_osd(image) is None
+    assert backend.detect_osd(image) is None
+    assert calls == ["osd"]
+
+
+class OSDStub(ocr.OCRBackend):
+    def __init__(self, osd):
+        self.osd = osd
+        self.calls = []
+
+    def image_to_data(self, image, lang=ocr.DEFAULT_LANG, psm=ocr.DEFAULT_PSM):
+        self.calls.append((image.size, lang))
+        return ocr.OCRResult(lines=[])
+
+    def detect_osd(self, image):
+        assert max(image.size) <= ocr.OSD_MAX_SIDE
+        return self.osd
+
+
+@pytest.mark.parametrize("osd, size, lang", [
+    (ocr.OSDResult(rotate=90, orientation_conf=5.0, script="Latin", script_conf=3.0), (1500, 2000), "eng"),
+    (ocr.OSDResult(rotate=90, orientation_conf=0.5, script="Devanagari", script_conf=3.0), (2000, 1500), "eng+hin"),
+    # Inconclusive (low script confidence, no OSD, unknown script): the caller's default
+    (ocr.OSDResult(rotate=0, orientation_conf=5.0, script="Latin", script_conf=0.1), (2000, 1500), "eng"),
+    (None, (2000, 1500), "eng"),
+    (ocr.OSDResult(rotate=0, orientation_conf=5.0, script="Cyrillic", script_conf=3.0), (2000, 1500), "eng"),
+])
+def test_recognise_rotates_and_picks_language(monkeypatch, osd, size, lang):
+    monkeypatch.setenv("OCR_DETECT_SCRIPT", "true")
+    backend = OSDStub(osd)
+    monkeypatch.setattr(ocr, "_backend", backend)
+
+    ocr.recognise(Image.new("L", (2000, 1500), 255), default_lang="eng")
+
+    assert backend.calls == [(size, lang)]
+
+
+def test_detect_layout_disabled(monkeypatch):
+    monkeypatch.setenv("OCR_DETECT_SCRIPT", "false")
+    monkeypatch.setattr(ocr, "_backend", OSDStub(ocr.OSDResult(90, 5.0, "Devanagari", 3.0)))
+
+    assert ocr.detect_layout(Image.new("L", (20, 10), 255), default_lang="eng") == (None, "eng")
+
+
+@pytest.mark.parametrize("backend, expected", [("tesserocr", True), ("pytesseract", False)])
+def test_detection_by_default_only_with_tesserocr(monkeypatch, backend, expected):
+    monkeypatch.delenv("OCR_DETECT_SCRIPT", raising=False)
+    stub = OSDStub(None)
+    stub.name = backend
+    monkeypatch.setattr(ocr, "_backend", stub)
+
+    assert ocr.detect_script_enabled() is expected
+
+
+def word(text, confidence, x, line, block=0):
+    return ocr.OCRWord(text, confidence, (x, line * 30, x + 40, line * 30 + 20), block=block, line=line)
+
+
+class ScriptedOCR(ocr.OCRBackend):
+    """ Main pass returns `page`; retries return `retry` """
+
+    def __init__(self, page, retry):
+        self.page = page
+        self.retry = retry
+        self.calls = []
+
+    def image_to_data(self, image, lang=ocr.DEFAULT_LANG, psm=ocr.DEFAULT_PSM):
+        self.calls.append((image.size, psm))
+        return self.page if len(self.calls) == 1 else self.retry
+
+
+def test_result_text_and_confidence():
+    result = ocr.OCRResult.from_words([
+        word("Name:", 90, 0, 0), word("Asha", 80, 50, 0),
+        word("Valid", 40, 0, 1, block=1),
+    ])
+
+    assert result.text == "Name: Asha\n\nValid"
+    assert result.confidence == pytest.approx((5 * 90 + 4 * 80 + 5 * 40) / 14 / 100)
+    assert result.low_confidence_lines() == [1]
+
+
+@pytest.fixture
+def no_osd(monkeypatch):
+    monkeypatch.setenv("OCR_DETECT_SCRIPT", "false")
+
+
+def test_recognise_retries_only_low_confidence_lines(monkeypatch, no_osd):
+    page = ocr.OCRResult.from_words([word("Good", 95, 0, 0), word("B4d", 30, 0, 1)])
+    retry = ocr.OCRResult.from_words([word("Bad", 92, 4, 0)])
+    backend = ScriptedOCR(page, retry)
+    monkeypatch.setattr(ocr, "_backend", backend)
+    image = Image.new("L", (200, 100), 255)
+
+    result = ocr.recognise(image, alternative=image)
+
+    assert result.text == "Good\nBad"
+    # One full pass, then only the low line (box plus padding) in line mode
+    assert backend.calls == [((200, 100), ocr.DEFAULT_PSM), ((44, 28), ocr.LINE_PSM)]  # left edge clamped at 0
+    assert result.lines[1].words[0].box[1] == 30 - ocr.LINE_PADDING
+
+
+def test_recognise_empty_page_retries_whole_page(monkeypatch, no_osd):
+    backend = ScriptedOCR(ocr.OCRResult(lines=[]), ocr.OCRResult.from_words([word("Text", 70, 0, 0)]))
+    monkeypatch.setattr(ocr, "_backend", backend)
+    image = Image.new("L", (200, 100), 255)
+
+    assert ocr.recognise(image, alternative=image).text == "Text"
+    assert backend.calls[1] == ((200, 100), ocr.AUTO_PSM)
+
+
+class CountingOSDStub(OSDStub):
+    name = "pytesseract"
+
+    def __init__(self, osd):
+        super().__init__(osd)
+        self.osd_calls = 0
+
+    def detect_osd(self, image):
+        self.osd_calls += 1
+        return super().detect_osd(image)
+
+
+@pytest.mark.parametrize("osd, lang", [
+    (ocr.OSDResult(rotate=0, orientation_conf=5.0, script="Devanagari", script_conf=3.0), "eng+hin"),
+    (ocr.OSDResult(rotate=0, orientation_conf=5.0, script="Latin", script_conf=3.0), "eng"),
+    (None, "eng+hin"),
+])
+def test_pytesseract_auto_detects_script_once_per_document(monkeypatch, osd, lang):
+    # Default install: pytesseract, OCR_DETECT_SCRIPT unset - no per-page
+    # OSD, one detection for the whole (here two-frame) image
+    monkeypatch.delenv("OCR_DETECT_SCRIPT", raising=False)
+    monkeypatch.setenv("OCR_WORKERS", "1")  # frames inline, where the stub is
+    backend = CountingOSDStub(osd)
+    monkeypatch.setattr(ocr, "_backend", backend)
+    tiff = io.BytesIO()
+    frames = [Image.new("L", (2000, 1500), 255) for _ in range(2)]
+    frames[0].save(tiff, format="TIFF", save_all=True, append_images=frames[1:])
+
+    ImageLoader().extract_bytes(tiff.getvalue(), "fax.tiff")
+
+    assert backend.osd_calls == 1
+    assert backend.calls and {call_lang for _, call_lang in backend.calls} == {lang}
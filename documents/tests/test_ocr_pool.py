@@ -0,0 +1,25 @@
+"""Tests for the shared OCR process pool."""
+import pytest
+
+from documents.extractors import ocr_pool
+
+
+def square(n):
+    if n == 3:
+        raise ValueError("bad page")
+    return n * n
+
+
+@pytest.fixture(params=[1, 2])
+def workers(request):
+    ocr_pool.configure(request.param)
+    yield request.param
+    ocr_pool.shutdown()
+    ocr_pool._workers = None
+
+
+def test_map_ordered_keeps_order_and_isolates_failures(workers):
+    results = ocr_pool.map_ordered(square, [(n,) for n in range(6)])
+
+    assert [r for i, r in enumerate(results) if i != 3] == [0, 1, 4, 16, 25]
+    assert isinstance(results[3], ValueError)
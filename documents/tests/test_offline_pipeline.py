@@ -0,0 +1,219 @@
+"""Pipeline tests that run without Ollama (FakeChatModel as the LLM)."""
+import asyncio
+import os
+import threading
+
+import fitz
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from documents.cache import ResultCache
+from documents.llm.fake import DEFAULT_EXTRACTION, FakeChatModel
+from documents.llm.processor import LLMProcessor
+from documents.llm.schema import DocumentExtractionList
+from documents.pipeline import Pipeline
+
+
+TEXT_FILES = [
+    "samples/txtfiles/trial_license.txt",
+    "samples/txtfiles/gym_membership.txt",
+    "samples/txtfiles/ssl_certificate.txt",
+]
+
+
+def make_pipeline(**kwargs):
+    kwargs.setdefault("use_cache", False)
+    # LLM path - the rule-based fast path is covered in test_rules.py
+    return Pipeline(processor=LLMProcessor(llm=FakeChatModel(), use_rules=False), **kwargs)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_keeps_input_order(workers):
+    pipeline = make_pipeline(extract_workers=workers, llm_workers=workers)
+    try:
+        files = TEXT_FILES + ["samples/docfiles/invoice.docx", "unsupported.xyz"]
+        result = pipeline.process_batch(files)
+    finally:
+        pipeline.close()
+
+    assert [doc.source for doc in result.documents] == [
+        "trial_license.txt", "gym_membership.txt", "ssl_certificate.txt", "invoice.docx", "unsupported.xyz",
+    ]
+    assert (result.successful, result.failed) == (4, 1)
+    assert result.documents[0].expiry_date == "2028-09-01"
+
+
+def test_in_memory_source_matches_path():
+    pipeline = make_pipeline()
+    with open(TEXT_FILES[0], "rb") as f:
+        from_bytes = pipeline.process_single("trial_license.txt", f.read())
+    from_path = pipeline.process_single(TEXT_FILES[0])
+    assert from_bytes == from_path
+
+
+def test_cache_hit_skips_llm(tmp_path):
+    llm = FakeChatModel()
+    pipeline = Pipeline(
+        processor=LLMProcessor(llm=llm, use_rules=False),
+        cache=ResultCache(path=str(tmp_path / "results.sqlite3")),
+    )
+    first = pipeline.process_single(TEXT_FILES[0])
+    second = pipeline.process_single(TEXT_FILES[0])
+
+    assert first == second
+    assert llm.calls == 1
+    assert pipeline.cache_stats()["hits"] == 1
+
+
+def test_async_batch():
+    pipeline = make_pipeline()
+    try:
+        result = asyncio.run(pipeline.aprocess_batch(TEXT_FILES, concurrency=2))
+    finally:
+        pipeline.close()
+    assert [doc.error for doc in result.documents] == [None, None, None]
+
+
+def test_iter_batch_yields_every_document():
+    pipeline = make_pipeline(extract_workers=2, llm_workers=2)
+    try:
+        sources = sorted(doc.source for doc in pipeline.iter_batch(TEXT_FILES))
+    finally:
+        pipeline.close()
+    assert sources == ["gym_membership.txt", "ssl_certificate.txt", "trial_license.txt"]
+
+
+def test_close_returns_with_nested_ocr_pools(tmp_path, monkeypatch):
+    # More OCR workers than extraction processes: each extraction process
+    # starts an OCR pool of its own, which must not keep close() waiting
+    monkeypatch.setenv("OCR_WORKERS", "4")
+    files = []
+    for name in ("a.pdf", "b.pdf"):
+        doc = fitz.open()
+        for _ in range(2):
+            doc.new_page().draw_rect(fitz.Rect(50, 50, 400, 300), fill=(0, 0, 0))  # "scanned"
+        doc.save(str(tmp_path / name))
+        files.append(str(tmp_path / name))
+    pipeline = make_pipeline(extract_workers=2, llm_workers=2)
+    pipeline.process_batch(files)
+
+    closer = threading.Thread(target=pipeline.close, daemon=True)
+    closer.start()
+    closer.join(timeout=30)
+    assert not closer.is_alive()
+
+
+def test_single_pdf_streams_pages():
+    pipeline = make_pipeline()
+    streamed = pipeline.process_single("samples/sample_PFD/insurance_policy.pdf")
+    assert streamed.error is None
+    assert streamed.source_type == "pdf"
+    assert streamed.confidence == 0.9
+
+
+def test_single_empty_file_reports_loader_error(tmp_path):
+    empty = tmp_path / "empty.txt"
+    empty.write_text("   ")
+    result = make_pipeline().process_single(str(empty))
+    assert result.error == "File is empty"
+    assert result.document_type == "unknown"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_packed_batch_matches_unpacked(workers):
+    llm = FakeChatModel()
+    pipeline = Pipeline(
+        processor=LLMProcessor(llm=llm, use_rules=False),
+        use_cache=False, extract_workers=workers, llm_workers=workers, pack_documents=True,
+    )
+    files = TEXT_FILES + ["samples/docfiles/invoice.docx", "unsupported.xyz"]
+    try:
+        packed = pipeline.process_batch(files)
+    finally:
+        pipeline.close()
+
+    # Three text files and the docx in one request
+    assert llm.calls == 1
+    assert (packed.successful, packed.failed) == (4, 1)
+    assert [doc.source for doc in packed.documents] == [
+        "trial_license.txt", "gym_membership.txt", "ssl_certificate.txt", "invoice.docx", "unsupported.xyz",
+    ]
+    unpacked = make_pipeline().process_batch(files)
+    assert packed.documents == unpacked.documents
+
+
+def test_failed_pack_retries_each_document(monkeypatch):
+    llm = FakeChatModel()
+    processor = LLMProcessor(llm=llm, use_rules=False)
+
+    def broken(texts):
+        raise ValueError("Packed request returned 2 extractions for 3 documents")
+
+    monkeypatch.setattr(processor, "process_packed", broken)
+    pipeline = Pipeline(processor=processor, use_cache=False, extract_workers=1, llm_workers=1, pack_documents=True)
+    result = pipeline.process_batch(TEXT_FILES)
+
+    assert result.successful == 3
+    assert llm.calls == 3
+
+
+def test_packing_does_not_hold_back_pdfs(tmp_path):
+    # A text file whose read blocks until written (named pipe): the PDF is
+    # not packable and must finish before the text file is released
+    slow = str(tmp_path / "slow.txt")
+    os.mkfifo(slow)
+    released = threading.Event()
+
+    def release():
+        with open(slow, "w") as f:
+            f.write("Gym membership, valid through 09/28\n")
+        released.set()
+
+    pipeline = make_pipeline(extract_workers=2, llm_workers=2, pack_documents=True)
+    results = pipeline.iter_batch([slow, "samples/sample_PFD/insurance_policy.pdf"] + TEXT_FILES[:1])
+    writer = threading.Timer(10, release)
+    writer.start()
+    try:
+        first = next(results)
+        assert first.source == "insurance_policy.pdf"
+        assert not released.is_set()
+        writer.cancel()
+        if not released.is_set():
+            release()
+        assert sorted(doc.source for doc in results) == ["slow.txt", "trial_license.txt"]
+    finally:
+        writer.join()
+        pipeline.close()
+
+
+def packed_processor(answers):
+    """ Processor whose packed request returns answers(documents) instead """
+    llm = FakeChatModel(responses=[
+        DEFAULT_EXTRACTION.model_copy(update={"document_type": document_type})
+        for document_type in ("invoice", "passport", "contract")
+    ])
+    processor = LLMProcessor(llm=llm, use_rules=False)
+    processor.packed_llm = processor.packed_llm | RunnableLambda(
+        lambda packed: DocumentExtractionList(documents=answers(packed.documents))
+    )
+    return processor, llm
+
+
+def test_packed_answers_matched_by_document_id():
+    # Answers come back in reverse order - each still goes to its own document
+    processor, llm = packed_processor(lambda documents: documents[::-1])
+    results = processor.process_packed(["first", "second", "third"])
+    assert [result.document_type for result in results] == ["invoice", "passport", "contract"]
+    assert llm.calls == 1
+
+
+def test_packed_answers_without_their_own_id_are_retried():
+    # Document 2 answered twice, document 3 not at all: both go through process()
+    def shifted(documents):
+        return [documents[0], documents[1], documents[1].model_copy(update={"document_type": "other"})]
+
+    processor, llm = packed_processor(shifted)
+    results = processor.process_packed(["first", "second", "third"])
+    assert results[0].document_type == "invoice"
+    assert [result.document_type for result in results[1:]] == ["invoice", "passport"]
+    assert llm.calls == 3
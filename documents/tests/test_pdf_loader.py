@@ -0,0 +1,77 @@
+"""PDFLoader per-page strategy tests (OCR backend replaced by a stub)."""
+import fitz
+import pytest
+
+from documents import metrics
+from documents.extractors import ocr, ocr_pool
+from documents.loaders.pdf_loader import PDFLoader, _page_task_args
+
+
+class StubOCR(ocr.OCRBackend):
+    name = "stub"
+
+    def __init__(self):
+        self.calls = []
+
+    def image_to_data(self, image, lang=ocr.DEFAULT_LANG, psm=ocr.DEFAULT_PSM):
+        self.calls.append((image.size, lang))
+        return ocr.OCRResult.from_words([
+            ocr.OCRWord(text, 90.0, (i * 50, 0, i * 50 + 40, 20), block=0, line=0)
+            for i, text in enumerate("scanned page text".split())
+        ])
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    backend = StubOCR()
+    monkeypatch.setattr(ocr, "_backend", backend)
+    ocr_pool.configure(1)  # OCR inline so the stub applies
+    yield backend.calls
+    ocr_pool._workers = None
+
+
+def mixed_pdf() -> bytes:
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "This page has a real text layer to read.")
+    doc.new_page()  # blank
+    doc.new_page().draw_rect(fitz.Rect(50, 50, 400, 300), fill=(0, 0, 0))  # "scanned"
+    return doc.tobytes()
+
+
+def test_mixed_pdf_ocrs_only_scanned_pages(fake_ocr):
+    with metrics.collect() as timings:
+        result = PDFLoader().extract_bytes(mixed_pdf(), "mixed.pdf")
+
+    assert result.error is None
+    assert result.text == "This page has a real text layer to read.\nscanned page text"
+    assert len(fake_ocr) == 1
+    assert timings.counts == {"pages_text": 1, "pages_blank": 1, "pages_ocr": 1}
+    assert result.confidence == pytest.approx((1.0 + 0.9) / 2)
+
+
+def test_page_dpi_scales_with_page_size():
+    doc = fitz.open()
+    for width, height in [(595, 842), (243, 153), (1684, 2384)]:
+        doc.new_page(width=width, height=height)
+    a4, card, poster = doc[0], doc[1], doc[2]
+    loader = PDFLoader()
+
+    assert loader._page_dpi(card) == PDFLoader.MAX_DPI
+    assert 250 <= loader._page_dpi(a4) <= 350
+    assert loader._page_dpi(poster) == PDFLoader.MIN_DPI
+
+
+def test_ocr_tasks_ship_single_pages_of_uploads():
+    doc = fitz.open()
+    for n in range(3):
+        doc.new_page().insert_text((72, 72), f"page {n}")
+    data = doc.tobytes()
+    doc = fitz.open(stream=data, filetype="pdf")
+
+    (page, page_num, dpi, lang), = _page_task_args(doc, data, [(2, 300)], "eng")
+
+    single = fitz.open(stream=page, filetype="pdf")
+    assert (len(single), page_num, dpi, lang) == (1, 0, 300, "eng")
+    assert single[0].get_text().strip() == "page 2"
+    # Files on disk are opened by the worker itself
+    assert list(_page_task_args(doc, "scan.pdf", [(2, 300)], "eng")) == [("scan.pdf", 2, 300, "eng")]
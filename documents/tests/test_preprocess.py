@@ -0,0 +1,63 @@
+"""Vectorised OCR preprocessing matches the PIL ImageEnhance steps."""
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance, ImageOps
+
+from documents.extractors import preprocess
+
+
+def pil_reference(img, invert):
+    if invert:
+        img = ImageOps.invert(img)
+    img = ImageEnhance.Contrast(img).enhance(2.0)
+    return ImageEnhance.Sharpness(img).enhance(1.5)
+
+
+@pytest.mark.parametrize("low, high, dark", [(100, 255, False), (0, 100, True)])
+def test_matches_pil(low, high, dark):
+    pixels = np.random.default_rng(1).integers(low, high, (64, 80), dtype=np.uint8)
+    img = Image.fromarray(pixels, "L")
+
+    result = preprocess.preprocess_for_ocr(img, invert_dark=True)
+    expected = pil_reference(img, invert=dark)
+
+    assert np.array_equal(np.asarray(result), np.asarray(expected))
+
+
+def test_crop_to_content_with_padding():
+    pixels = np.full((200, 300), 255, dtype=np.uint8)
+    pixels[50:60, 100:180] = 0
+
+    assert preprocess.content_bbox(pixels) == (80, 30, 200, 80)
+    assert preprocess.preprocess_for_ocr(pixels, crop=True).size == (120, 50)
+    assert preprocess.content_bbox(np.full((10, 10), 255, dtype=np.uint8)) is None
+
+
+def lined_page(width, height, line_height, pitch):
+    pixels = np.full((height, width), 255, dtype=np.uint8)
+    for top in range(pitch, height - pitch, pitch):
+        pixels[top:top + line_height, width // 10:width // 2] = 0
+    return pixels
+
+
+def test_estimate_line_height():
+    assert preprocess.estimate_line_height(lined_page(1000, 1400, 24, 60)) == 24
+    assert preprocess.estimate_line_height(np.full((100, 100), 255, dtype=np.uint8)) is None
+
+
+def test_normalise_resolution_downscales_large_text_only():
+    big_text = Image.fromarray(lined_page(2000, 2800, 120, 250))
+    resized, scale = preprocess.normalise_resolution(big_text)
+    assert scale == pytest.approx(preprocess.TARGET_LINE_HEIGHT / 120, rel=0.05)
+    assert resized.size == (round(2000 * scale), round(2800 * scale))
+
+    small_text = Image.fromarray(lined_page(800, 1000, 10, 30))
+    assert preprocess.normalise_resolution(small_text) == (small_text, 1.0)
+
+
+def test_normalise_resolution_caps_pixels(monkeypatch):
+    monkeypatch.setattr(preprocess, "MAX_PIXELS", 1_000_000)
+    resized, scale = preprocess.normalise_resolution(Image.new("RGB", (2000, 2000), "white"))
+
+    assert resized.size == (1000, 1000)
+    assert scale == pytest.approx(0.5)
@@ -0,0 +1,135 @@
+"""LLMProcessor chunking tests (FakeChatModel as the LLM)."""
+import pytest
+
+from documents.llm.fake import FakeChatModel
+from documents.llm.processor import EXTRACTION_PROMPT, LLMProcessor
+
+
+def make_pages(count=40):
+    return [f"Page {i} " + " ".join(f"word{i}-{j}" for j in range(60)) for i in range(count)]
+
+
+def test_stream_chunks_cover_every_page():
+    processor = LLMProcessor(chunk_size=500, chunk_overlap=50, llm=FakeChatModel())
+    pages = make_pages()
+    chunks = list(processor._iter_chunks(iter(pages)))
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    joined = "\n".join(chunks)
+    assert all(f"word{i}-59" in joined for i in range(len(pages)))
+    # Same chunking as splitting the whole text, give or take a boundary
+    whole = processor.splitter.split_text("\n".join(pages))
+    assert abs(len(chunks) - len(whole)) <= 2
+
+
+def test_stream_pulls_pages_while_llm_runs():
+    llm = FakeChatModel()
+    processor = LLMProcessor(chunk_size=500, chunk_overlap=50, max_concurrency=2, llm=llm)
+    pages = make_pages()
+    pulled = []
+
+    def page_stream():
+        for page in pages:
+            pulled.append(llm.calls)
+            yield page
+
+    result = processor.process_stream(page_stream())
+
+    assert result.expiry_date == "2028-09-01"
+    assert llm.calls > 1
+    # LLM calls had started before the last pages were read
+    assert pulled[-1] > 0
+
+
+def test_stream_single_chunk_and_empty():
+    llm = FakeChatModel()
+    processor = LLMProcessor(llm=llm)
+    processor.process_stream(["short page", "   ", "another"])
+    assert llm.calls == 1
+
+    with pytest.raises(ValueError):
+        processor.process_stream(["", "  "])
+
+
+def test_rank_puts_dated_chunks_first():
+    from documents.llm.relevance import rank_chunks
+
+    chunks = [
+        "Terms and conditions of service.",
+        "The parties agree to the following.",
+        "Policy No: POL-2024-88123 Issue Date: Sep 15, 2024 Valid Through 09/28",
+        "Governing law and jurisdiction.",
+    ]
+    assert rank_chunks(chunks)[0] == 2
+    # Ties keep document order, title chunk ahead
+    assert rank_chunks(chunks)[1:] == [0, 1, 3]
+
+
+def test_early_stop_skips_boilerplate_chunks(monkeypatch):
+    from documents.llm.fake import DEFAULT_EXTRACTION
+
+    monkeypatch.setenv("LLM_EARLY_STOP", "true")
+    invoice = DEFAULT_EXTRACTION.model_copy(update={"document_type": "invoice"})
+    llm = FakeChatModel(responses=[invoice])
+    processor = LLMProcessor(chunk_size=500, chunk_overlap=50, max_concurrency=2, llm=llm)
+    text = "\n".join(make_pages())
+
+    result = processor.process_chunked(text)
+    assert result.document_type == "invoice"
+    assert llm.calls < len(processor._split(text))
+
+    # Type never settles ('other') - every chunk is sent
+    llm = FakeChatModel()
+    LLMProcessor(chunk_size=500, chunk_overlap=50, llm=llm).process_chunked(text)
+    assert llm.calls == len(processor._split(text))
+
+
+def test_token_budget_follows_context_window():
+    from documents.llm import tokens
+
+    small = LLMProcessor(llm=FakeChatModel(), context_tokens=4096)
+    large = LLMProcessor(llm=FakeChatModel(), context_tokens=32768)
+    assert small.chunk_size < large.chunk_size <= tokens.MAX_CHUNK_TOKENS
+    # Prompt, schema and the answer all fit next to a full chunk
+    overhead = tokens.prompt_overhead_tokens(EXTRACTION_PROMPT) + tokens.OUTPUT_RESERVE_TOKENS
+    assert small.chunk_size + overhead <= 4096
+
+
+def test_token_chunks_are_script_aware():
+    processor = LLMProcessor(llm=FakeChatModel(), context_tokens=4096)
+    english = "\n".join(["The policy is valid through the end of the term."] * 2000)
+    hindi = "\n".join(["यह पॉलिसी अवधि के अंत तक मान्य है और नवीनीकरण आवश्यक है।"] * 2000)
+
+    english_chunks = processor.splitter.split_text(english)
+    hindi_chunks = processor.splitter.split_text(hindi)
+    # Fewer characters of Devanagari fit in the same token budget
+    assert max(map(len, hindi_chunks)) < max(map(len, english_chunks))
+    assert all(processor.length(chunk) <= processor.chunk_size for chunk in english_chunks + hindi_chunks)
+
+
+def test_stream_sends_relevant_chunks_of_the_window_first(monkeypatch):
+    from langchain_core.runnables import RunnableLambda
+
+    from documents.llm.fake import DEFAULT_EXTRACTION
+
+    monkeypatch.setenv("LLM_EARLY_STOP", "true")
+    processor = LLMProcessor(max_concurrency=2, llm=FakeChatModel())
+    chunks = [f"Boilerplate section {n}." for n in range(12)]
+    chunks[3] = "Policy No: POL-2024-88123 Issue Date: Sep 15, 2024 Valid Through 09/28"
+    sent = []
+
+    def extract(inputs):
+        sent.append(inputs["text"])
+        return DEFAULT_EXTRACTION.model_copy(update={"document_type": "invoice"})
+
+    processor.extractor = RunnableLambda(extract)
+    monkeypatch.setattr(processor, "_iter_chunks", lambda pages: iter(pages))
+
+    result = processor.process_stream(chunks)
+
+    assert result.document_type == "invoice"
+    # Dated chunk (4th of a 4-chunk window) goes out with the title chunk,
+    # and the settled answer stops reading the stream
+    assert set(sent[:2]) == {chunks[0], chunks[3]}
+    assert len(sent) < len(chunks)
@@ -0,0 +1,52 @@
+"""Rule-based fast path tests."""
+import pytest
+
+from documents.llm import rules
+from documents.llm.fake import FakeChatModel
+from documents.llm.processor import LLMProcessor
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("09/28", ("2028-09-01", False)),
+    ("09/15/2027", ("2027-09-15", False)),
+    ("30/11/2024", ("2024-11-30", False)),
+    ("01/11/2024", ("2024-01-11", True)),
+    ("12-Mar-2020", ("2020-03-12", False)),
+    ("Sep 30, 2025 23:59:59 GMT", ("2025-09-30", False)),
+    ("not a date", None),
+])
+def test_parse_date(value, expected):
+    assert rules.parse_date(value) == expected
+
+
+def test_templated_document():
+    result = rules.extract(read("samples/txtfiles/ssl_certificate.txt"))
+    assert result.document_type == "certificate"
+    assert (result.activation_date, result.expiry_date) == ("2024-10-01", "2025-09-30")
+    assert result.confidence >= rules.MIN_CONFIDENCE
+    assert "valid_until" not in result.extracted_fields
+    assert result.extracted_fields["organization_o"] == "Secure Payments International Ltd"
+
+
+def test_unsure_document_is_not_confident():
+    text = "ACCESS CARD\n\nHolder: J. Doe\nStart Date: 01/11/2024\nExpires: 01/11/2025\n"
+    result = rules.extract(text)
+    assert result.confidence < rules.MIN_CONFIDENCE
+
+
+def test_processor_uses_rules_then_llm():
+    llm = FakeChatModel()
+    processor = LLMProcessor(llm=llm, use_rules=True)
+
+    fast = processor.process(read("samples/txtfiles/trial_license.txt"))
+    assert llm.calls == 0
+    assert (fast.activation_date, fast.expiry_date) == ("2024-11-01", "2024-11-30")
+
+    # Untemplated text goes to the LLM
+    processor.process("Thanks for your message, see you next week.")
+    assert llm.calls == 1